@@ -0,0 +1,30 @@
+import pytest
+
+
+@pytest.fixture
+def boston_data():
+    """Makes binned columns of the Boston housing data set, and their categories."""
+    # pandas is only loaded by the tests that use the data
+    from load_data import load_csv_data, bin_data_set
+
+    def make(columns=slice(10, 14), n_bins=3):
+        binned_data = bin_data_set(load_csv_data("BostonHousing.csv"), n_bins=n_bins)
+        binned_data = binned_data[list(binned_data.columns[columns])]
+        categories = {
+            column: sorted({value.rsplit("_", 1)[0] for value in binned_data[column]})
+            for column in binned_data.columns
+        }
+        return binned_data, categories
+
+    return make
+
+
+@pytest.fixture
+def boston_case_model(boston_data):
+    """Makes the case model of binned columns of the Boston housing data set."""
+    from load_data import generate_case_model
+
+    def make(columns=slice(10, 14), n_bins=3):
+        return generate_case_model(*boston_data(columns, n_bins))
+
+    return make
@@ -1,65 +1,25 @@
 import numpy as np
-from scipy.spatial.distance import cdist
 
 
-# converts a new (testing) set (variable X) to the same domain as the dataframe after discretization
-# variable myColumns describes the columns to be discretized in the (testing) set
-def fitToDomain(X, df, myColumns):
-    result = X.copy()
-
-    # for each of the columns to be discretized
-    for col in myColumns:
-
-        # get the ranges of the dataframe in that column
-        myRanges = df[col].unique()
-        ranges = np.ndarray(shape=(len(myRanges), 2))
-        # convert this into a 2D array where each row represents a bin
-        # each row has the two ends of the bins as entry
-        for i in range(len(myRanges)):
-            thisRange = myRanges[i].split("-")
-            ranges[i] = thisRange
-
-        # we will now replace each value in the column by a range
-        myCol = [""] * len(X)
-
-        for i in range(len(X)):
-            # first, retrieve each value
-            myValue = X[col].values[i]
-
-            # retrieve the closest range
-            closestRange = getClosestRange(myValue, ranges)
-
-            # replace the value
-            myCol[i] = closestRange
-
-        result[col] = myCol
-
-    return result
-
-
-# returns the range that is closest to myValue in form of a string
-def getClosestRange(myValue, ranges):
-    # get the distances to each of the ends of the bins in the ranges
-    distances = cdist([[myValue]], ranges.reshape(-1, 1)).reshape(2, len(ranges))
-
-    # get the index of the smallest distance in the array
-    # (this index is two-dimensional, because there are two ends of bins.
-    # in the array, each range is represented in a row, where the two columns describe the ends of the bin.)
-    index_closest = np.where(distances == np.amin(distances))
-    # (we are only interested in the index of the respective bin, and not which end is the closest one)
-    index_closest = index_closest[0][0]
-
-    # convert this to a string in the same format as the original
-    myRange = str(ranges[index_closest][0]) + '-' + str(ranges[index_closest][1])
-    return myRange
-
-# adds empty columns to match the discretized dataframe
-def addMyCols(df, myCols):
-    result = df.copy()
-    dfCols = result.columns
-
-    for column in myCols:
-        if column not in dfCols:
-            result[column] = 0
-
-    return result
\ No newline at end of file
+# returns, for each value, the index of the range that has one of its ends closest to the value.
+# the ranges are given as an array where each row represents a bin, with the two ends of the bin as entries.
+# when several ends are equally close, the first range with such an end is chosen.
+def getClosestRangeIndices(myValues, ranges):
+    ends = np.asarray(ranges, dtype=float).reshape(-1)
+    # the sorted distinct ends, and for each of them the first range that has it as an end
+    sortedEnds, firstIndex = np.unique(ends, return_index=True)
+    firstRange = firstIndex // 2
+
+    # the closest end is either the next smaller or the next larger one
+    upper = np.clip(np.searchsorted(sortedEnds, myValues), 1, len(sortedEnds) - 1)
+    lower = upper - 1
+    if len(sortedEnds) == 1:
+        upper = lower = np.zeros(len(myValues), dtype=int)
+    lowerDistance = np.abs(myValues - sortedEnds[lower])
+    upperDistance = np.abs(myValues - sortedEnds[upper])
+    return np.where(
+        (lowerDistance < upperDistance)
+        | ((lowerDistance == upperDistance) & (firstRange[lower] <= firstRange[upper])),
+        firstRange[lower],
+        firstRange[upper],
+    )
@@ -0,0 +1,15 @@
+import numpy as np
+from dataPreProcessing.dataEncoder import getClosestRangeIndices
+
+
+def test_closest_ranges():
+    ranges = np.array([[0.0, 1.0], [2.0, 3.0], [4.0, 5.0], [6.0, 7.0]])
+    values = np.array([0.2, 2.4, 4.1, 6.9, 9.0, -3.0, 1.5])
+    assert list(getClosestRangeIndices(values, ranges)) == [0, 1, 2, 3, 3, 0, 0]
+
+
+def test_closest_ranges_match_brute_force():
+    ranges = np.array([[-2.0, -1.0], [-1.0, 0.5], [0.5, 7.25], [7.5, 9.0], [0.5, 0.5]])
+    values = np.random.default_rng(0).uniform(-5, 12, 1000)
+    closest = np.abs(values[:, None] - ranges.reshape(-1)[None, :]).argmin(axis=1) // 2
+    assert list(getClosestRangeIndices(values, ranges)) == list(closest)
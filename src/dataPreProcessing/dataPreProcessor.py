@@ -1,37 +1,46 @@
+import pickle
 from dataPreProcessing.discretizations import discretizations
-from dataPreProcessing.dataEncoder import fitToDomain, addMyCols
-from dataPreProcessing.oneHotEncoder import encode
 # This is the wrapper class for all of the files in this folder.
 # It allows for data discretization of the training dataframe, and also uses oneHotEncoding if specified so.
 # When new data is predicted, this class transforms the new data to the same format as the discretized training set.
-# Again, oneHotEncoding can be used here if desired so.
+# Again, oneHotEncoding can be used here if desired so, with the columns of the training set.
+# With sparse=True, the one-hot encoded dataframes have sparse columns.
+# The fitted discretizer can be saved with `save` and loaded in another process with `load`,
+# without the training set.
+# The one-hot encoder, with pandas and scipy, is only imported when it is fitted.
 
 class dataPreProcessor:
-    _discretizedTrain = None
-    _myCols = None
+    _discretizer = None
+    _encoder = None
 
     # this method is used to discretize the training set before learning
     # the variable "algorithm" decides which algorithm is used for discretization
-    def discretizeTrain(self, train, algorithm, oneHotEncoding=False, no_bins=None):
-        # save the numeric columns that will be discretized
-        self._myCols = train._get_numeric_data().columns
-
-        # discretize the dataframe and save it
-        self._discretizedTrain = discretizations.discretize(train, algorithm, no_bins=no_bins)
+    # the options, like n_jobs and sampleSize, are passed on to the discretizer
+    def discretizeTrain(self, train, algorithm, oneHotEncoding=False, no_bins=None, sparse=False, **options):
+        # fit the discretizer, and discretize the dataframe
+        self._discretizer = discretizations.getDiscretizer(algorithm, no_bins=no_bins, **options)
+        discretizedTrain = self._discretizer.fit_transform(train)
 
         # use ohe if specified so
         if oneHotEncoding:
-            df = encode(self._discretizedTrain)
-            self._oheColumns = df.columns
-            return df
-        return self._discretizedTrain
+            from dataPreProcessing.oneHotEncoder import oneHotEncoder
+            self._encoder = oneHotEncoder().fit(discretizedTrain)
+            return self._encoder.encode(discretizedTrain, sparse)
+        return discretizedTrain
 
-    def discretizeTest(self, test, oneHotEncoding=False):
-        result = fitToDomain(test, self._discretizedTrain, self._myCols)
+    def discretizeTest(self, test, oneHotEncoding=False, sparse=False):
+        result = self._discretizer.transform(test)
 
         # use ohe if specified so
         if oneHotEncoding:
-            df = encode(result)
-            df = addMyCols(df, self._oheColumns)
-            return df
+            return self._encoder.encode(result, sparse)
         return result
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            pickle.dump(self, file)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as file:
+            return pickle.load(file)
@@ -1,122 +1,82 @@
-import warnings
-
-import matplotlib.pyplot
 import numpy as np
-from sklearn.cluster import DBSCAN
-from sklearn.metrics import silhouette_score
-from sklearn.preprocessing import MinMaxScaler
-
-from skopt.space import Real, Integer
-from skopt.utils import use_named_args
-from skopt import gp_minimize
-from skopt.plots import plot_objective, plot_convergence
-
-import matplotlib.pyplot as plt
-import time
-import sys
-
-
-# discretizes a column of the dataframe
-def transformCol(myData, n_calls=50):
-    space = [Real(sys.float_info.min, 1.0, name='eps'),
-             Integer(1, len(myData), name='min_samples')]
-
-    # scaling the range of the data in order to make sure that eps is between 0 and 1
-    scaler = MinMaxScaler()
-    myDataNormalized = scaler.fit_transform(myData)
-
-    @use_named_args(space)
-    def objective(**params):
-        dbSCAN = DBSCAN(**params, n_jobs=-1)
-        y = dbSCAN.fit_predict(myDataNormalized)
 
-        if len(np.unique(y)) != 1:
-            score = silhouette_score(myData, dbSCAN.labels_)
-            return -score
+from dataPreProcessing.discretizations.discretizer import Discretizer, clusterRanges
+
+
+# discretizes a column of the dataframe by density, like DBSCAN does for a single column.
+# the sorted values are split at the gaps that are wider than eps, where eps is the knee of the sorted
+# distances of the values to their minSamples-th nearest neighbour. segments with fewer than minSamples
+# values are outliers, which are merged into the neighbouring segment across the smallest gap,
+# and at most maxBins segments are kept, by merging the segments across the smallest gaps
+def fitCol(myData, maxBins=10):
+    values = np.asarray(myData, dtype=float).reshape(-1)
+    order = np.argsort(values, kind='stable')
+    sortedValues = values[order]
+    gaps = np.diff(sortedValues)
+    minSamples = max(2, int(round(np.log(len(values)))))
+
+    if len(values) > minSamples:
+        eps = knee(np.sort(kDistances(sortedValues, minSamples - 1)))
+        starts = mergeOutliers(np.flatnonzero(gaps > eps) + 1, gaps, len(values), minSamples)
+
+        # keep the widest gaps when there are too many segments
+        if len(starts) > maxBins - 1:
+            widest = np.argsort(-gaps[starts - 1], kind='stable')[:maxBins - 1]
+            starts = np.sort(starts[widest])
+    else:
+        starts = np.array([], dtype=int)
+
+    predictions = np.empty(len(values), dtype=int)
+    predictions[order] = np.searchsorted(starts, np.arange(len(values)), side='right')
+    return clusterRanges(myData, predictions)
+
+
+# the distance of each of the sorted values to its k-th nearest neighbour.
+# the k nearest neighbours of a value are k of its k + 1 neighbouring values in the sorted order
+def kDistances(sortedValues, k):
+    n = len(sortedValues)
+    indices = np.arange(n)
+    distances = np.full(n, np.inf)
+    for offset in range(k + 1):
+        first = indices - offset
+        valid = (first >= 0) & (first + k < n)
+        window = np.maximum(sortedValues[indices[valid]] - sortedValues[first[valid]],
+                            sortedValues[first[valid] + k] - sortedValues[indices[valid]])
+        distances[valid] = np.minimum(distances[valid], window)
+    return distances
+
+
+# the value at the knee of an increasing curve, which is the point furthest below the line between its ends
+def knee(curve):
+    line = np.linspace(curve[0], curve[-1], len(curve))
+    return curve[np.argmax(line - curve)]
+
+
+# merges each segment with fewer than minSamples values into its neighbour across the smallest gap.
+# segments are given by the indices where they start in the sorted values, except the first
+def mergeOutliers(starts, gaps, n, minSamples):
+    bounds = [0, *starts, n]
+    kept = []
+    carried = None
+    for i in range(len(bounds) - 1):
+        start = bounds[i] if carried is None else carried
+        carried = None
+        isLast = i == len(bounds) - 2
+        if bounds[i + 1] - start >= minSamples:
+            kept.append(start)
+        elif isLast or (kept and gaps[start - 1] <= gaps[bounds[i + 1] - 1]):
+            # merge with the segment on the left, or keep the segment if there is none
+            if not kept:
+                kept.append(start)
         else:
-            # in case of one cluster, we will not be able to compute silhouette score nor
-            # have any useful information for the column.
-            # Therefore, assign score worse than worst silhouette score
-            return 2
-
-    start_time = time.time()
-    gp = gp_minimize(objective, space, n_calls=n_calls, random_state=0, n_jobs=-1)
-    end_time = time.time()
-    #print("Time used for discretizing the data: %.2f minutes." % ((end_time - start_time) / 60))
-
-    bestEps = gp.x[0]
-    bestMinSamples = gp.x[1]
-
-    # showMyPlots(gp)
-
-    # parameter tuning is finished, make clusters using the best parameters
-    dbSCAN = DBSCAN(bestEps, bestMinSamples, n_jobs=-1)
-    predictions = dbSCAN.fit_predict(myDataNormalized)
-
-    clusterIndices = np.unique(predictions)
-
-    # additionally, for each outlier, we create a new cluster to assign it to
-    if np.isin(-1, clusterIndices):
-
-        myCluster = clusterIndices.max() + 1
-        for i in range(len(predictions)):
-            if predictions[i] == -1:
-                predictions[i] = myCluster
-                myCluster += 1
-
-    numClusters = len(np.unique(predictions))
-    clusters = [0] * numClusters
-
-    # create ranges for each cluster and assign for each datapoint
-    for i in range(0, numClusters):
-        # for the current cluster, find the indices of the datapoints that belong to this cluster
-        myClusterIndices = np.where(predictions == i)
-        # these are the values of the current cluster we are looking at
-        myCluster = myData[myClusterIndices]
-        # get the min and max values of these
-        myMin = float(myCluster.min())
-        myMax = float(myCluster.max())
-        # here, clusters are described as a range of the maximum and minimum value of the cluster.
-        # This makes prediction easier compared to simply using the centroids of the algorithm
-        clusters[i] = str(myMin) + '-' + str(myMax)
-
-    result = [""] * len(myData)
-
-    for i in range(len(result)):
-        thisResult = str(clusters[predictions[i]])
-        result[i] = thisResult
-
-    return result
-
-
-def showMyPlots(gp):
-    plt.tight_layout()
-    plot_convergence(gp)
-    plt.show()
-
-    _ = plot_objective(gp)
-    plt.show()
-
-
-class DBSCANClustering:
-    def __init__(self):
-        pass
-
-    def transform(self, X, y=None):
-        result = X.copy()
-
-        # get the columns to transform
-        myCols = result._get_numeric_data().columns
+            # merge with the segment on the right
+            carried = start
+    return np.array(kept[1:], dtype=int)
 
-        # for each of these columns
-        for i in range(0, len(myCols)):
-            thisCol = myCols[i]
-            result[thisCol].astype('str')
 
-            myData = result[[thisCol]].copy().to_numpy()
+class DBSCANClustering(Discretizer):
+    # the number of clusters follows from the density of the values, and no_bins caps it
+    candidateNoBins = ()
 
-            # replace the value of the column
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                result[thisCol] = transformCol(myData)
-        return result
+    def fitCol(self, myData, noBins):
+        return fitCol(myData) if noBins is None else fitCol(myData, noBins)
@@ -1,22 +1,28 @@
 # Wrapper for the discretization algorithms.
-from dataPreProcessing.discretizations import kMeansClustering, DBSCANClustering, ewBinning, edBinning
+from dataPreProcessing.discretizations import kMeansClustering, DBSCANClustering, ewBinning, edBinning, \
+    optimalKMeansClustering
 
 
-def discretize(myData, algorithm, no_bins=None):
+# returns an unfitted discretizer for the given algorithm.
+# the options, like n_jobs and sampleSize, are passed on to the discretizer
+def getDiscretizer(algorithm, no_bins=None, **options):
     if algorithm == "kMeans":
-        kMeans = kMeansClustering.kMeansClustering(no_bins)
-        return kMeans.transform(myData)
+        return kMeansClustering.kMeansClustering(no_bins, **options)
+
+    if algorithm == "optimalKMeans":
+        return optimalKMeansClustering.optimalKMeansClustering(no_bins, **options)
 
     if algorithm == "DBSCAN":
-        dbSCAN = DBSCANClustering.DBSCANClustering()
-        return dbSCAN.transform(myData)
+        return DBSCANClustering.DBSCANClustering(no_bins, **options)
 
     if algorithm == "EWBinning":
-        ewBin = ewBinning.ewBinning(no_bins)
-        return ewBin.transform(myData)
+        return ewBinning.ewBinning(no_bins, **options)
 
     if algorithm == "EDBinning":
-        edBin = edBinning.edBinning(no_bins)
-        return edBin.transform(myData)
+        return edBinning.edBinning(no_bins, **options)
 
     raise Exception("No valid discretization algorithm has been selected.")
+
+
+def discretize(myData, algorithm, no_bins=None, **options):
+    return getDiscretizer(algorithm, no_bins, **options).fit_transform(myData)
@@ -0,0 +1,209 @@
+import hashlib
+import os
+import pickle
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from dataPreProcessing.dataEncoder import getClosestRangeIndices
+
+# the number of bins chosen for a column, by (column fingerprint, method, sample size, seed),
+# so that discretizing the same training set again skips the search for the number of bins.
+# only the most recently chosen _noBinsCacheSize numbers are kept in memory
+_noBinsCache = dict()
+_noBinsCacheSize = 1024
+
+
+# base class for the discretization algorithms.
+# a discretizer is fitted on the numeric columns of a training set, and keeps the bins of each column
+# as an array where each row represents a bin, with the two ends of the bin as entries.
+# the bins are named by their ranges, like "0.5-1.5", in the discretized data.
+# a fitted discretizer can be saved to disk and loaded again, and then discretizes new data on its own.
+#
+# when no number of bins is given, the number of bins of each column is the one in candidateNoBins
+# with the best silhouette score. n_jobs sets the number of processes the scores and the columns are
+# computed on (all cores if -1), and sampleSize computes the silhouette score on a random sample of
+# that many values, drawn with the given seed, instead of on the whole column. the chosen numbers of
+# bins are also kept in cacheFile, if given, so that other processes and later runs reuse them.
+#
+# a subclass defines predict(myData, k), which assigns each value of a column, given as an array with
+# one row per value, to one of k clusters. a subclass that fits its columns in another way overrides
+# fitCol instead, and if it selects the number of bins on its own, also selectNoBins.
+class Discretizer:
+    candidateNoBins = range(2, 11)
+
+    def __init__(self, no_bins=None, n_jobs=None, sampleSize=None, seed=0, cacheFile=None):
+        self._bins = dict()
+        self._no_bins = no_bins
+        self._n_jobs = n_jobs
+        self._sampleSize = sampleSize
+        self._seed = seed
+        self._cacheFile = cacheFile
+
+    # discretizes a column of the training set into noBins clusters.
+    # returns, for each value, the index of its cluster,
+    # and the ranges of the clusters as an array where each row represents a cluster.
+    def fitCol(self, myData, noBins):
+        return clusterRanges(myData, self.predict(myData, noBins))
+
+    def fit(self, X, y=None):
+        self.fit_transform(X)
+        return self
+
+    # discretizes the training set, where each value is replaced by the range of its cluster
+    def fit_transform(self, X, y=None):
+        result = X.copy()
+        self._bins = dict()
+
+        numericCols = list(X._get_numeric_data().columns)
+        myData = [X[[thisCol]].to_numpy() for thisCol in numericCols]
+        noBins = self.selectNoBins(myData)
+        fitted = self._map(_fitCol, repeat(self), myData, noBins)
+
+        # for each of the numeric columns
+        for thisCol, (predictions, ranges) in zip(numericCols, fitted):
+            # keep the bins in the order in which they first appear in the data
+            order = np.argsort(np.unique(predictions, return_index=True)[1])
+            ranks = np.empty_like(order)
+            ranks[order] = np.arange(len(order))
+            self._bins[thisCol] = ranges[order]
+
+            result[thisCol] = self.labels(thisCol)[ranks[predictions]]
+        return result
+
+    # returns the number of bins of each of the given columns
+    def selectNoBins(self, columns):
+        if self._no_bins is not None or not self.candidateNoBins:
+            return [self._no_bins] * len(columns)
+
+        keys = [(fingerprint(myData), type(self).__name__, self._sampleSize, self._seed) for myData in columns]
+        noBins = {key: _noBinsCache[key] for key in keys if key in _noBinsCache}
+        if self._cacheFile is not None and len(noBins) < len(keys):
+            saved = loadNoBins(self._cacheFile)
+            noBins.update({key: saved[key] for key in keys if key in saved})
+        todo = [i for i, key in enumerate(keys) if key not in noBins]
+
+        # score every candidate number of bins of every column at once
+        tasks = [(i, k) for i in todo for k in self.candidateNoBins]
+        scores = self._map(_score, repeat(self), [columns[i] for i, _ in tasks], [k for _, k in tasks])
+
+        bestScores = {i: -float('inf') for i in todo}
+        bestKs = {i: 0 for i in todo}
+        for (i, k), score in zip(tasks, scores):
+            if score is not None and score > bestScores[i]:
+                bestScores[i] = score
+                bestKs[i] = k
+        for i in todo:
+            noBins[keys[i]] = bestKs[i]
+        if self._cacheFile is not None and todo:
+            saveNoBins(self._cacheFile, {keys[i]: bestKs[i] for i in todo})
+        for key in keys:
+            rememberNoBins(key, noBins[key])
+        return [noBins[key] for key in keys]
+
+    # the silhouette score of splitting a column into k clusters,
+    # or None if the values end up in a single cluster
+    def score(self, myData, k):
+        y = self.predict(myData, k)
+
+        # silhouette score only works when more than one cluster is found by the algorithm
+        if len(np.unique(y)) == 1:
+            return None
+        # sklearn is only loaded when the number of bins is searched for
+        from sklearn.metrics import silhouette_score
+        if self._sampleSize is not None and self._sampleSize < len(myData):
+            return silhouette_score(myData, y, sample_size=self._sampleSize, random_state=self._seed)
+        return silhouette_score(myData, y)
+
+    # applies the function to the arguments, on n_jobs processes
+    def _map(self, function, *iterables):
+        if self._n_jobs is None or self._n_jobs == 1:
+            return list(map(function, *iterables))
+        with ProcessPoolExecutor(max_workers=os.cpu_count() if self._n_jobs < 0 else self._n_jobs) as executor:
+            return list(executor.map(function, *iterables))
+
+    # discretizes new data, where each value is replaced by the range that has one of its ends closest to the value
+    def transform(self, X, y=None):
+        result = X.copy()
+        for thisCol, bins in self._bins.items():
+            closest = getClosestRangeIndices(X[thisCol].to_numpy(dtype=float), bins)
+            result[thisCol] = self.labels(thisCol)[closest]
+        return result
+
+    # the names of the bins of a column
+    def labels(self, thisCol):
+        return np.array([str(float(myMin)) + '-' + str(float(myMax)) for myMin, myMax in self._bins[thisCol]], dtype=object)
+
+    @property
+    def columns(self):
+        return list(self._bins.keys())
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            pickle.dump(self, file)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+
+def _score(discretizer, myData, k):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return discretizer.score(myData, k)
+
+
+def _fitCol(discretizer, myData, noBins):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return discretizer.fitCol(myData, noBins)
+
+
+# keeps the number of bins of a column in memory, forgetting the oldest one when there are too many
+def rememberNoBins(key, noBins):
+    _noBinsCache.pop(key, None)
+    _noBinsCache[key] = noBins
+    if len(_noBinsCache) > _noBinsCacheSize:
+        del _noBinsCache[next(iter(_noBinsCache))]
+
+
+# the numbers of bins kept in a cache file, or none if there is no such file yet
+def loadNoBins(path):
+    try:
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        return dict()
+
+
+# adds numbers of bins to a cache file. the file is replaced at once, so that processes that read it
+# at the same time never see half of it
+def saveNoBins(path, noBins):
+    saved = loadNoBins(path)
+    saved.update(noBins)
+    temporary = '%s.%d.tmp' % (path, os.getpid())
+    with open(temporary, 'wb') as file:
+        pickle.dump(saved, file)
+    os.replace(temporary, path)
+
+
+# identifies a column by its values
+def fingerprint(myData):
+    myData = np.ascontiguousarray(myData)
+    return hashlib.sha1(myData.tobytes()).hexdigest(), myData.shape, str(myData.dtype)
+
+
+# returns the clusters of the given predictions, and the range of the values of each cluster.
+# clusters are described as a range of the minimum and maximum value of the cluster.
+# this makes prediction easier compared to simply using the centroids of the algorithm
+def clusterRanges(myData, predictions):
+    clusters, predictions = np.unique(predictions, return_inverse=True)
+    values = myData.reshape(-1).astype(float)
+    myMins = np.full(len(clusters), np.inf)
+    myMaxs = np.full(len(clusters), -np.inf)
+    np.minimum.at(myMins, predictions, values)
+    np.maximum.at(myMaxs, predictions, values)
+    return predictions.reshape(-1), np.stack([myMins, myMaxs], axis=1)
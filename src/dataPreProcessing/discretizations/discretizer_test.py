@@ -0,0 +1,142 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from dataPreProcessing.dataPreProcessor import dataPreProcessor
+from dataPreProcessing.discretizations import discretizer as discretizerModule
+from dataPreProcessing.discretizations.discretizer import Discretizer, clusterRanges
+from dataPreProcessing.discretizations.discretizations import getDiscretizer
+from dataPreProcessing.discretizations import ewBinning, edBinning, DBSCANClustering
+from dataPreProcessing.discretizations.optimalKMeansClustering import Segmentation, silhouette1d
+from sklearn.metrics import silhouette_score
+
+
+class thresholdDiscretizer(Discretizer):
+    candidateNoBins = ()
+
+    def fitCol(self, myData, noBins):
+        return clusterRanges(myData, (myData.reshape(-1) >= 0).astype(int))
+
+
+def test_fit_transform_keeps_numeric_bins():
+    train = pd.DataFrame({"x": [1.5, -2.0, -0.5, 3.0], "name": ["a", "b", "c", "d"]})
+    discretizer = thresholdDiscretizer()
+    assert list(discretizer.fit_transform(train)["x"]) == [
+        "1.5-3.0", "-2.0--0.5", "-2.0--0.5", "1.5-3.0"
+    ]
+    assert discretizer.columns == ["x"]
+    test = pd.DataFrame({"x": [-10.0, 0.4, 0.6, 9.0], "name": ["e", "f", "g", "h"]})
+    transformed = discretizer.transform(test)
+    assert list(transformed["x"]) == ["-2.0--0.5", "-2.0--0.5", "1.5-3.0", "1.5-3.0"]
+    assert list(transformed["name"]) == list(test["name"])
+
+
+def test_saved_pre_processor_discretizes_without_training_set(tmp_path):
+    train = pd.DataFrame({"x": np.arange(30.0), "y": np.arange(30.0) ** 2})
+    test = pd.DataFrame({"x": [-1.0, 12.0, 40.0], "y": [3.0, 200.0, 1000.0]})
+    preProcessor = dataPreProcessor()
+    preProcessor.discretizeTrain(train, "EDBinning", oneHotEncoding=True, no_bins=3)
+    expected = preProcessor.discretizeTest(test, oneHotEncoding=True)
+    preProcessor.save(tmp_path / "preProcessor.pkl")
+    loaded = dataPreProcessor.load(tmp_path / "preProcessor.pkl")
+    assert loaded.discretizeTest(test, oneHotEncoding=True).equals(expected)
+
+
+def test_all_algorithms_fit():
+    train = pd.DataFrame({"x": np.concatenate([np.zeros(10), np.ones(10) * 5, np.ones(10) * 9])})
+    for algorithm in ["EWBinning", "EDBinning", "kMeans", "optimalKMeans", "DBSCAN"]:
+        discretizer = getDiscretizer(algorithm, no_bins=3).fit(train)
+        assert set(discretizer.transform(train)["x"]) <= set(discretizer.labels("x"))
+
+
+def test_equal_width_and_equal_depth_bins():
+    myData = np.array([[0.0], [9.0], [1.0], [2.0], [3.0], [4.0], [5.0], [6.0]])
+    assert list(ewBinning.binning(3).fit_predict(myData)) == [0, 2, 0, 0, 1, 1, 1, 2]
+    assert list(edBinning.binning(3).fit_predict(myData)) == [0, 2, 0, 1, 1, 2, 2, 2]
+    # equal values are never split between two bins
+    ties = np.array([[1.0], [1.0], [1.0], [2.0], [2.0], [3.0]])
+    assert list(edBinning.binning(2).fit_predict(ties)) == [0, 0, 0, 1, 1, 1]
+
+
+def test_number_of_bins_is_selected_once():
+    rng = np.random.default_rng(0)
+    train = pd.DataFrame({"x": np.concatenate([rng.normal(0, 1, 50), rng.normal(20, 1, 50)]),
+                          "y": np.concatenate([rng.normal(0, 1, 30), rng.normal(10, 1, 30), rng.normal(20, 1, 40)])})
+    discretizerModule._noBinsCache.clear()
+    discretizer = getDiscretizer("kMeans")
+    assert discretizer.selectNoBins([train[["x"]].to_numpy(), train[["y"]].to_numpy()]) == [2, 3]
+    assert len(discretizerModule._noBinsCache) == 2
+
+    # the sweep is skipped for columns that were seen before
+    discretizer.score = None
+    assert discretizer.selectNoBins([train[["y"]].to_numpy()]) == [3]
+
+    # a sampled silhouette score is cached separately, and finds the same clusters here
+    sampled = getDiscretizer("kMeans", n_jobs=2, sampleSize=40, seed=1)
+    assert sampled.selectNoBins([train[["x"]].to_numpy(), train[["y"]].to_numpy()]) == [2, 3]
+    assert len(discretizerModule._noBinsCache) == 4
+    assert sampled.fit_transform(train).equals(getDiscretizer("kMeans", no_bins=None).fit_transform(train))
+
+
+def selectNoBinsInNewProcess(cacheFile, columns):
+    discretizerModule._noBinsCache.clear()
+    discretizer = getDiscretizer("kMeans", cacheFile=cacheFile)
+    # the sweep would fail, so the numbers of bins must come from the cache file
+    discretizer.score = None
+    return discretizer.selectNoBins(columns)
+
+
+def test_number_of_bins_is_reused_from_the_cache_file(tmp_path):
+    rng = np.random.default_rng(1)
+    columns = [np.concatenate([rng.normal(0, 1, 50), rng.normal(20, 1, 50)]).reshape(-1, 1)]
+    cacheFile = str(tmp_path / "noBins.pkl")
+    discretizerModule._noBinsCache.clear()
+    assert getDiscretizer("kMeans", cacheFile=cacheFile).selectNoBins(columns) == [2]
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(selectNoBinsInNewProcess, cacheFile, columns).result() == [2]
+
+
+def test_number_of_bins_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(discretizerModule, "_noBinsCacheSize", 2)
+    discretizerModule._noBinsCache.clear()
+    for key in range(3):
+        discretizerModule.rememberNoBins(key, 2)
+    assert list(discretizerModule._noBinsCache) == [1, 2]
+
+
+def test_optimal_k_means():
+    myData = np.array([[1.0], [9.0], [2.0], [10.0], [2.0], [30.0], [11.0], [1.5]])
+    segmentation = Segmentation(myData, 4)
+    assert list(segmentation.predict(2)) == [0, 0, 0, 0, 0, 1, 0, 0]
+    assert list(segmentation.predict(3)) == [0, 1, 0, 1, 0, 2, 1, 0]
+    # the sum of squared distances to the means of the clusters {1, 1.5, 2, 2}, {9, 10, 11} and {30}
+    assert np.isclose(segmentation.costs[3, -1], 0.6875 + 2.0)
+    for k in range(2, 5):
+        y = segmentation.predict(k)
+        assert np.isclose(silhouette1d(myData, y), silhouette_score(myData, y))
+
+    # the number of bins of each column is chosen from its segmentation, in the process that fits it
+    rng = np.random.default_rng(0)
+    train = pd.DataFrame({"x": np.concatenate([rng.normal(0, 1, 50), rng.normal(20, 1, 50)]),
+                          "y": np.concatenate([rng.normal(0, 1, 30), rng.normal(10, 1, 30), rng.normal(20, 1, 40)])})
+    discretizer = getDiscretizer("optimalKMeans").fit(train)
+    assert [len(discretizer.labels(col)) for col in ["x", "y"]] == [2, 3]
+    assert getDiscretizer("optimalKMeans", n_jobs=2).fit_transform(train).equals(discretizer.transform(train))
+
+
+def test_density_segments_absorb_outliers():
+    myData = np.concatenate([np.linspace(0, 1, 40), [3.0], np.linspace(10, 11, 40), [40.0]]).reshape(-1, 1)
+    predictions, ranges = DBSCANClustering.fitCol(myData)
+    assert ranges.tolist() == [[0.0, 3.0], [10.0, 40.0]]
+    assert list(predictions[[0, 40, 41, 81]]) == [0, 0, 1, 1]
+    # at most maxBins segments are kept, split at the widest gaps
+    spread = np.concatenate([np.linspace(start, start + 1, 20) for start in [0, 10, 20, 30, 50]]).reshape(-1, 1)
+    assert len(DBSCANClustering.fitCol(spread)[1]) == 5
+    assert DBSCANClustering.fitCol(spread, maxBins=2)[1].tolist() == [[0.0, 31.0], [50.0, 51.0]]
+
+
+def test_small_segments_in_a_row_merge_across_the_gap_to_their_left():
+    # a segment of 3 values, two single values and another segment of 3 values, with minSamples = 3
+    sortedValues = np.array([0.0, 0.1, 0.2, 5.0, 6.0, 8.0, 8.1, 8.2])
+    gaps = np.diff(sortedValues)
+    # 5 is closer to 6 than to 0.2, and then {5, 6} is closer to 8 than to 0.2
+    assert DBSCANClustering.mergeOutliers(np.array([3, 4, 5]), gaps, 8, 3).tolist() == [3]
@@ -0,0 +1,135 @@
+import numpy as np
+from dataPreProcessing.discretizations.discretizer import Discretizer, clusterRanges
+
+
+# k-means clustering of a column that finds the optimal clusters, by dynamic programming over the
+# sorted values, like Ckmeans.1d.dp. the clusters for every number of clusters are found at once,
+# and are the same on every run.
+# so the number of bins of a column is chosen when the column is fitted, from the segmentation that
+# fits it, rather than by scoring each number of bins on its own. each column is then segmented once,
+# in the process that fits it.
+class optimalKMeansClustering(Discretizer):
+    def predict(self, myData, k):
+        return Segmentation(myData, k).predict(k)
+
+    def selectNoBins(self, columns):
+        return [self._no_bins] * len(columns)
+
+    # the silhouette score is computed exactly and fast for a single column, so no sample is needed
+    def fitCol(self, myData, noBins):
+        if noBins is not None:
+            return super().fitCol(myData, noBins)
+
+        segmentation = Segmentation(myData, max(self.candidateNoBins))
+        bestScore, bestPredictions = -float('inf'), segmentation.predict(1)
+        for k in self.candidateNoBins:
+            predictions = segmentation.predict(k)
+            thisScore = clusterScore(myData, predictions)
+            if thisScore is not None and thisScore > bestScore:
+                bestScore, bestPredictions = thisScore, predictions
+        return clusterRanges(myData, bestPredictions)
+
+
+# the silhouette score of the clusters, or None if the values end up in a single cluster
+def clusterScore(myData, predictions):
+    if len(np.unique(predictions)) == 1:
+        return None
+    return silhouette1d(myData, predictions)
+
+
+# the optimal splits of the sorted values of a column into 1, ..., maxK clusters, where the cost of
+# a cluster is the sum of squared distances of its values to their mean.
+# equal values are handled once, weighted by their count, so they always end up in the same cluster.
+class Segmentation:
+    def __init__(self, myData, maxK):
+        values = np.asarray(myData, dtype=float).reshape(-1)
+        self.values, self.inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+        n = len(self.values)
+        self.maxK = min(maxK, n)
+
+        # prefix sums of the counts, and of the (centred) values and squared values, weighted by their counts
+        centred = self.values - values.mean()
+        self._counts = np.concatenate([[0], np.cumsum(counts)])
+        self._sums = np.concatenate([[0], np.cumsum(counts * centred)])
+        self._squares = np.concatenate([[0], np.cumsum(counts * centred ** 2)])
+
+        # costs[k, i] is the lowest cost of the first i values in k clusters,
+        # and starts[k, i] is where the last of these clusters starts
+        self.costs = np.full((self.maxK + 1, n + 1), np.inf)
+        self.starts = np.zeros((self.maxK + 1, n + 1), dtype=int)
+        self.costs[1, 1:] = self.cost(0, np.arange(1, n + 1))
+        for k in range(2, self.maxK + 1):
+            self._fill(k, k, n, k - 1, n - 1)
+
+    # the cost of the cluster of the values starts, ..., ends - 1
+    def cost(self, starts, ends):
+        counts = self._counts[ends] - self._counts[starts]
+        sums = self._sums[ends] - self._sums[starts]
+        return np.maximum(self._squares[ends] - self._squares[starts] - sums * sums / counts, 0)
+
+    # fills in the costs of the first lo, ..., hi values in k clusters, knowing that the last cluster starts
+    # between startLo and startHi. the start of the last cluster never decreases when a value is added,
+    # so the best start for the middle of a range bounds the starts to try on either side of it.
+    # the middles of all ranges at the same depth are handled at once
+    def _fill(self, k, lo, hi, startLo, startHi):
+        lo, hi, startLo, startHi = (np.array([bound]) for bound in (lo, hi, startLo, startHi))
+        while len(lo):
+            mid = (lo + hi) // 2
+            first = np.maximum(startLo, k - 1)
+            lengths = np.minimum(startHi, mid - 1) - first + 1
+
+            # all starts to try, for all middles
+            offsets = np.cumsum(lengths) - lengths
+            starts = np.arange(lengths.sum()) - np.repeat(offsets - first, lengths)
+            candidates = self.costs[k - 1, starts] + self.cost(starts, np.repeat(mid, lengths))
+
+            # the first start with the lowest cost, for each middle
+            order = np.lexsort((candidates, np.repeat(np.arange(len(mid)), lengths)))
+            best = starts[order[offsets]]
+            self.costs[k, mid] = candidates[order[offsets]]
+            self.starts[k, mid] = best
+
+            lo, hi, startLo, startHi = (np.concatenate(pair) for pair in
+                                        ((lo, mid + 1), (mid - 1, hi), (startLo, best), (best, startHi)))
+            remaining = lo <= hi
+            lo, hi, startLo, startHi = lo[remaining], hi[remaining], startLo[remaining], startHi[remaining]
+
+    # the index of the cluster of each value of the column, for k clusters
+    def predict(self, k):
+        k = min(k, self.maxK)
+        clusters = np.empty(len(self.values), dtype=int)
+        end = len(self.values)
+        for cluster in range(k, 0, -1):
+            start = self.starts[cluster, end] if cluster > 1 else 0
+            clusters[start:end] = cluster - 1
+            end = start
+        return clusters[self.inverse]
+
+
+# the silhouette score of clusters of a single column, the same as sklearn's silhouette_score.
+# the sum of the distances from each value to the values of a cluster follows from the prefix sums
+# of the sorted values of the cluster, so all distances are never computed
+def silhouette1d(myData, predictions):
+    values = np.asarray(myData, dtype=float).reshape(-1)
+    clusters, predictions = np.unique(predictions, return_inverse=True)
+    counts = np.bincount(predictions)
+    everyValue = np.arange(len(values))
+
+    distances = np.empty((len(clusters), len(values)))
+    for cluster in range(len(clusters)):
+        members = np.sort(values[predictions == cluster])
+        prefix = np.concatenate([[0], np.cumsum(members)])
+        below = np.searchsorted(members, values, side='right')
+        distances[cluster] = (values * below - prefix[below]
+                              + prefix[-1] - prefix[below] - values * (len(members) - below))
+
+    ownCounts = counts[predictions]
+    a = distances[predictions, everyValue] / np.maximum(ownCounts - 1, 1)
+    means = distances / counts[:, None]
+    means[predictions, everyValue] = np.inf
+    b = means.min(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = (b - a) / np.maximum(a, b)
+    scores[ownCounts == 1] = 0
+    return np.mean(np.nan_to_num(scores))
@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from scipy import sparse as sp
 
 def encode(X):
     cols = X.columns
@@ -7,4 +9,53 @@ def encode(X):
     result = pd.get_dummies(X,
                             columns=categorical_cols,
                             drop_first=False)
-    return result
\ No newline at end of file
+    return result
+
+
+# one-hot encoder that keeps the categories of the training set, and encodes new data with the same columns
+# as the training set, in the same order as encode(). categories that are not in the training set are left out.
+# the data can be encoded as a scipy sparse matrix, or as a dataframe with sparse columns
+class oneHotEncoder:
+    _numericCols = None
+    _categories = None
+
+    def fit(self, X):
+        self._numericCols = list(X._get_numeric_data().columns)
+        categoricalCols = sorted(set(X.columns) - set(self._numericCols))
+        self._categories = {col: pd.Categorical(X[col]).categories for col in categoricalCols}
+        return self
+
+    # the names of the encoded columns
+    @property
+    def columns(self):
+        return self._numericCols + [str(col) + '_' + str(category)
+                                    for col, categories in self._categories.items() for category in categories]
+
+    # encodes the data as a sparse matrix with a row for each row of the data and a column for each of the columns
+    def transform(self, X):
+        return sp.hstack([sp.csr_matrix(X[self._numericCols].to_numpy(dtype=float)), self.dummies(X)], format='csr')
+
+    # the one-hot encoded categorical columns, as a sparse matrix of zeros and ones
+    def dummies(self, X):
+        blocks = [sp.csr_matrix((len(X), 0), dtype=np.uint8)]
+        rows = np.arange(len(X))
+        for col, categories in self._categories.items():
+            codes = categories.get_indexer(X[col])
+            known = codes >= 0
+            blocks.append(sp.csr_matrix((np.ones(known.sum(), dtype=np.uint8), (rows[known], codes[known])),
+                                        shape=(len(X), len(categories))))
+        return sp.hstack(blocks, format='csr')
+
+    # encodes the data as a dataframe, with sparse columns if so specified.
+    # without, the columns are encoded by pd.get_dummies with the categories of the training set,
+    # so that they have the same dtype as those of encode() on the installed version of pandas
+    def encode(self, X, sparse=False):
+        if not sparse:
+            categorical = X[self._numericCols].copy()
+            for col, categories in self._categories.items():
+                categorical[col] = pd.Categorical.from_codes(categories.get_indexer(X[col]), categories)
+            return pd.get_dummies(categorical, columns=list(self._categories), drop_first=False)
+        numeric = X[self._numericCols].astype(pd.SparseDtype(float, 0))
+        names = self.columns[len(self._numericCols):]
+        dummies = pd.DataFrame.sparse.from_spmatrix(self.dummies(X), index=X.index, columns=names)
+        return pd.concat([numeric, dummies], axis=1)
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from dataPreProcessing.oneHotEncoder import encode, oneHotEncoder
+from decisionTree.decisionTreeClassifier import asMatrix
+
+
+def test_encoder_keeps_the_columns_of_the_training_set():
+    train = pd.DataFrame({"n": [1.5, 0.0, 2.0], "x": ["b", "a", "b"], "c": ["y", "y", "z"]})
+    encoder = oneHotEncoder().fit(train)
+    # with the same dtypes as pd.get_dummies, which differ between versions of pandas
+    assert encoder.encode(train).equals(encode(train))
+    indexed = train.set_index(pd.Index([7, 5, 9]))
+    assert encoder.encode(indexed).equals(encode(indexed))
+    assert encoder.columns == ["n", "c_y", "c_z", "x_a", "x_b"]
+
+    # categories that are not in the training set are left out, and missing ones are all zero
+    test = pd.DataFrame({"n": [3.0, 0.0], "x": ["b", "new"], "c": ["y", "y"]})
+    expected = [[3.0, 1, 0, 0, 1], [0.0, 1, 0, 0, 0]]
+    assert encoder.transform(test).toarray().tolist() == expected
+    assert list(encoder.encode(test).columns) == encoder.columns
+    assert encoder.encode(test).astype(float).values.tolist() == expected
+
+    sparse = encoder.encode(test, sparse=True)
+    assert all(isinstance(dtype, pd.SparseDtype) for dtype in sparse.dtypes)
+    assert np.array_equal(asMatrix(sparse).toarray(), expected)
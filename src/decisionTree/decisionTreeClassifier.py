@@ -1,12 +1,6 @@
-from matplotlib import pyplot as plt
+import pandas as pd
 from sklearn import tree
 import time
-from skopt import BayesSearchCV
-from skopt.space import Integer
-from skopt.utils import use_named_args
-from skopt.plots import plot_objective
-from sklearn.model_selection import cross_val_score
-from skopt import gp_minimize
 from pathlib import Path
 
 
@@ -14,6 +8,9 @@ from pathlib import Path
 # note: to train the decision trees, discretization of the data is not required
 # however, oneHotEncoding is required
 # to do this, use oneHotEncoder.encode() from the folder preprocessing
+# dataframes with sparse columns, like those of oneHotEncoder.encode(X, sparse=True), are given to the tree
+# as a sparse matrix
+# skopt and matplotlib are only loaded when a tree is tuned
 class decisionTreeClassifier:
 
     def __init__(self):
@@ -21,6 +18,15 @@ class decisionTreeClassifier:
 
     # performs hyperparameter tuning on the decision tree
     def trainDecTree(self, X, y, scoring='f1_macro'):
+        from matplotlib import pyplot as plt
+        from skopt import gp_minimize
+        from skopt.plots import plot_objective
+        from skopt.space import Integer
+        from skopt.utils import use_named_args
+        from sklearn.model_selection import cross_val_score
+
+        X, y = asMatrix(X), asArray(y)
+
         # defining the search space
         search_spaces = [
             Integer(1, 50, name='max_depth'),
@@ -54,4 +60,18 @@ class decisionTreeClassifier:
         plt.close()
 
     def predict(self, X):
-        return self.clf.predict(X)
+        return self.clf.predict(asMatrix(X))
+
+
+# returns a dataframe with only sparse columns as a sparse matrix
+def asMatrix(X):
+    if isinstance(X, pd.DataFrame) and len(X.columns) and all(isinstance(dtype, pd.SparseDtype) for dtype in X.dtypes):
+        return X.sparse.to_coo().tocsr()
+    return X
+
+
+# returns a sparse column as a dense one
+def asArray(y):
+    if isinstance(y, pd.Series) and isinstance(y.dtype, pd.SparseDtype):
+        return y.sparse.to_dense()
+    return y
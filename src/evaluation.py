@@ -1,18 +1,18 @@
-import numpy as np
 import pandas as pd
 from sklearn.metrics import accuracy_score, f1_score
-from decisionTree.decisionTreeClassifier import decisionTreeClassifier
-from dataPreProcessing.oneHotEncoder import encode
-from hero import defeasible_theory_search, predict
+from decisionTree.decisionTreeClassifier import decisionTreeClassifier, asArray
+from hero import vectorised_defeasible_theory_search, predict
 from load_data import generate_case_model
-from learning import Theory
-from logic import Fact
+from learning import Theory, TheoryPredictor
 import time
 
 import warnings
 
 warnings.filterwarnings("ignore")
 
+# the label scored for rows where the model makes no prediction
+UNKNOWN_LABEL = "unknown"
+
 
 def compute_performance_metrics(y, y_hat):
     return {'Acc': accuracy_score(y, y_hat), 'F1': f1_score(y, y_hat, average='weighted')}
@@ -20,7 +20,7 @@ def compute_performance_metrics(y, y_hat):
 
 def evaluate_decision_trees(data_set: pd.DataFrame, target_column: list, data_columns: list, hyper_parameters: dict,
                             decision_tree: decisionTreeClassifier = None):
-    X, y = data_set[data_columns], data_set[target_column]
+    X, y = data_set[data_columns], asArray(data_set[target_column])
 
     if decision_tree is None:
         t1 = time.time()
@@ -40,36 +40,27 @@ def evaluate_decision_trees(data_set: pd.DataFrame, target_column: list, data_co
     return model_eval, decision_tree
 
 
+# the theory is written to theory_file, unless it is None
 def evaluate_rule_mining(data_set, categories, unknown_fact, columns, search_depth=100, max_premise_size=10,
-                         theory: Theory = None):
+                         theory: Theory = None, n_jobs=None, theory_file="output/BostonHousing.verheij"):
     if theory is None:
         t1 = time.time()
         case_model = generate_case_model(data_set, categories)
         theory = Theory.learn_with_pruned_search(case_model, depth=search_depth,
-                                                 max_premise_size=max_premise_size, log=False)
+                                                 max_premise_size=max_premise_size, log=False, n_jobs=n_jobs)
         t2 = time.time()
         model_eval = {'training_runtime': (t2 - t1), 'model_type': 'rule mining', 'data_type': 'train'}
     else:
         model_eval = {'training_runtime': 0, 'model_type': 'rule mining', 'data_type': 'test'}
 
-    y_hat, y_ = [], []
-    for i in data_set.index:
-        # Try to predict each column where the values of all other columns are known.
-        X, y = data_set[columns].loc[i], data_set[unknown_fact].loc[i]
-        known_facts = [Fact.fromStr(s, categories[s.rsplit("_", 1)[1]]) for s in X]
-        prediction = theory.predict(
-            known_facts,
-            unknown_fact,
-        )
-        if isinstance(prediction, tuple):
-            y_hat_i, argument = prediction
-            y_hat.append(str(y_hat_i))
-        else:
-            y_hat.append(None)
-        y_.append(y)
+    # Try to predict each column where the values of all other columns are known.
+    predictions, _ = TheoryPredictor(theory).predict_batch(data_set[columns], unknown_fact)
+    y_hat = [str(y_hat_i) if y_hat_i is not None else UNKNOWN_LABEL for y_hat_i in predictions]
+    y_ = list(data_set[unknown_fact])
 
-    with open("output/BostonHousing.verheij", "w", encoding='utf-8') as file:
-        file.write(str(theory))
+    if theory_file is not None:
+        with open(theory_file, "w", encoding='utf-8') as file:
+            file.write(str(theory))
 
     #y_encoded = encode(pd.DataFrame(y_)).values.tolist()
     #y_hat_encoded = encode(pd.DataFrame(y_hat)).values.tolist()
@@ -85,7 +76,7 @@ def evaluate_hero_algorithm(data_set, categories, unknown_fact):
     train = data_set.values.tolist()
     x, y = [a[:-1] for a in train], [a[-1] for a in train]
     t1 = time.time()
-    theory = defeasible_theory_search(x, y)
+    theory = vectorised_defeasible_theory_search(x, y)
     t2 = time.time()
     model_eval = {'training_runtime': (t2 - t1)}
 
@@ -94,13 +85,13 @@ def evaluate_hero_algorithm(data_set, categories, unknown_fact):
     y_hat, y_ = [], []
     for i in data_set.index:
         # Try to predict each column where the values of all other columns are known.
+        # the facts of HeRO are the values of the data set, like `category_statement`
         X, y = data_set.loc[i, data_set.columns != unknown_fact], data_set[unknown_fact].loc[i]
-        known_facts = [Fact.fromStr(s, categories[s.split("_", 1)[1]]) for s in X]
-        y_hat_i, argument = predict(known_facts, theory)
-        y_hat.append(y_hat_i)
+        y_hat_i = predict(list(X), theory)
+        y_hat.append(y_hat_i if y_hat_i is not None else UNKNOWN_LABEL)
         y_.append(y)
 
-    performance_metrics = compute_performance_metrics(encode(y), np.array(y_hat))
+    performance_metrics = compute_performance_metrics(y_, y_hat)
     model_eval.update(performance_metrics)
 
     print("Hero Accuracy: %.02f Exec Time: %.02f" % (model_eval.get('Acc'), model_eval.get('training_runtime')))
@@ -0,0 +1,23 @@
+import evaluation
+from evaluation import evaluate_hero_algorithm, evaluate_rule_mining
+from learning import Theory
+from fractions import Fraction
+import pandas as pd
+
+
+def test_hero_scores_rows_without_prediction_as_unknown(monkeypatch):
+    data_set = pd.DataFrame({"x": ["a_x", "b_x"], "y": ["d_y", "d_y"]})
+    # the rule only applies to the first row
+    theory = [((["a_x"], "d_y"), Fraction(0))]
+    monkeypatch.setattr(evaluation, "vectorised_defeasible_theory_search", lambda x, y: theory)
+    model_eval, _ = evaluate_hero_algorithm(data_set, {}, "y")
+    assert model_eval["Acc"] == 0.5
+
+
+def test_rule_mining_scores_rows_without_prediction_as_unknown():
+    data_set = pd.DataFrame({"x": ["a_x", "b_x"], "y": ["d_y", "d_y"]})
+    categories = {"x": ["a", "b"], "y": ["d"]}
+    model_eval, _ = evaluate_rule_mining(
+        data_set, categories, "y", ["x", "y"], theory=Theory([], [], []), theory_file=None
+    )
+    assert model_eval["Acc"] == 0
@@ -0,0 +1,322 @@
+"""
+Runs the experiments of `main.py` and `main_iris.py` over a parameter grid, on a
+process pool.
+
+A grid maps parameter names to the values to try, for example
+`{"dataset": ["IRIS.csv"], "binning_method": ["kMeans"], "no_bins": [None, 3],
+"search_depth": [5, 20], "max_premises": [2, 4]}`. Every combination of the
+preprocessing parameters (`dataset`, `binning_method`, `no_bins`) is evaluated with
+a decision tree, and every full combination with rule mining. The discretised data
+is prepared once per preprocessing combination, and shared by the tasks that
+evaluate its models. Result rows are appended to a csv file as soon as a task
+finishes; configurations that are already in the file are skipped, so an
+interrupted sweep can be restarted.
+The theory of every rule mining configuration is written to its own file in
+`output`, named after the configuration. The theories of all search depths and
+maximum premise sizes of a preprocessing combination are learned with a single
+sweep of the pruned search, which shares the parts of the searches that do not
+depend on these settings.
+"""
+import csv
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import product
+from typing import *
+
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from dataPreProcessing.dataPreProcessor import dataPreProcessor
+from dataPreProcessing.oneHotEncoder import oneHotEncoder
+from evaluation import evaluate_decision_trees, evaluate_rule_mining
+from learning import Theory
+from load_data import generate_case_model
+
+PREPROCESSING_PARAMETERS = ("dataset", "binning_method", "no_bins")
+RESULT_FIELDS = ["model_type", "data_type", "training_runtime", "Acc", "F1"]
+
+# Takes the discretised train and test set and the raw train and test set, and
+# returns the train and test set restricted to the columns used, and the target column.
+ColumnSelection = Callable[
+    [pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame],
+    Tuple[pd.DataFrame, pd.DataFrame, str],
+]
+
+
+@dataclass
+class PreparedData:
+    # one-hot encoded with sparse columns, for decision trees
+    encoded_train: pd.DataFrame
+    encoded_test: pd.DataFrame
+    encoded_target_col: str
+    # values like `category_statement`, for rule mining
+    train: pd.DataFrame
+    test: pd.DataFrame
+    target_col: str
+    train_categories: Dict[str, List[str]]
+    test_categories: Dict[str, List[str]]
+
+
+def parameter_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    return [dict(zip(grid.keys(), values)) for values in product(*grid.values())]
+
+
+def prepare_data(
+    dataset: str,
+    binning_method: str,
+    no_bins: Optional[int],
+    select_columns: ColumnSelection,
+    no_bins_cache_file: Optional[str] = None,
+) -> PreparedData:
+    """
+    Discretises and encodes the train and test split of a data set. The number of
+    bins of each column that the discretizer chooses is kept in
+    `no_bins_cache_file`, if given, and reused from there.
+    """
+    df = pd.read_csv(os.path.join("data", dataset))
+    df.dropna(inplace=True)
+    train, test = train_test_split(df, test_size=0.2, random_state=1)
+
+    # the discretizer is fitted once, and the one-hot encoding is built from its result
+    preProcessor = dataPreProcessor()
+    discretized_train = preProcessor.discretizeTrain(
+        train,
+        algorithm=binning_method,
+        oneHotEncoding=False,
+        no_bins=no_bins,
+        cacheFile=no_bins_cache_file,
+    )
+    discretized_test = preProcessor.discretizeTest(test, oneHotEncoding=False)
+    encoder = oneHotEncoder().fit(discretized_train)
+    encoded_train, encoded_test, encoded_target_col = select_columns(
+        encoder.encode(discretized_train, sparse=True),
+        encoder.encode(discretized_test, sparse=True),
+        train,
+        test,
+    )
+
+    discretized_train, discretized_test, target_col = select_columns(
+        discretized_train, discretized_test, train, test
+    )
+    categories = {
+        column: list(set(discretized_train[column])) for column in discretized_train.columns
+    }
+    return PreparedData(
+        encoded_train,
+        encoded_test,
+        encoded_target_col,
+        with_statements(discretized_train),
+        with_statements(discretized_test),
+        target_col,
+        categories,
+        {column: categories[column] for column in discretized_test.columns},
+    )
+
+
+def with_statements(discretized: pd.DataFrame) -> pd.DataFrame:
+    """Suffixes every value with its column, e.g. `12.6-17.4` becomes `12.6-17.4_ptratio`."""
+    return pd.DataFrame(
+        {
+            column: discretized[column].astype(str) + "_" + str(column)
+            for column in discretized.columns
+        },
+        index=discretized.index,
+    )
+
+
+def theory_file(configuration: Dict[str, Any]) -> str:
+    """The file for the theory of a configuration, like `output/BostonHousing_kMeans_3_20_4.verheij`."""
+    name = "_".join(
+        [
+            os.path.splitext(configuration["dataset"])[0],
+            *[str(configuration[parameter]) for parameter in PREPROCESSING_PARAMETERS[1:]],
+            str(configuration["search_depth"]),
+            str(configuration["max_premises"]),
+        ]
+    )
+    return os.path.join("output", name + ".verheij")
+
+
+def run_decision_tree(configuration: Dict[str, Any], data: PreparedData) -> List[Dict[str, Any]]:
+    """Evaluates a decision tree and returns a result row for the train and the test set."""
+    columns = [c for c in data.encoded_train.columns if c != data.encoded_target_col]
+    train_eval, decision_tree = evaluate_decision_trees(
+        data.encoded_train, data.encoded_target_col, columns, dict()
+    )
+    test_eval, _ = evaluate_decision_trees(
+        data.encoded_test, data.encoded_target_col, columns, dict(), decision_tree
+    )
+    test_eval["training_runtime"] = train_eval.get("training_runtime")
+    return [{**configuration, **train_eval}, {**configuration, **test_eval}]
+
+
+def run_rule_mining(
+    configurations: List[Dict[str, Any]],
+    data: PreparedData,
+    learning_n_jobs: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Learns the theories of all rule mining configurations on the same data with
+    one pruned search sweep, on `learning_n_jobs` processes, and returns a result
+    row for the train and the test set of each. The training runtime of every
+    configuration is that of the whole sweep.
+    """
+    settings = [
+        (configuration["search_depth"], configuration["max_premises"])
+        for configuration in configurations
+    ]
+    t1 = time.time()
+    case_model = generate_case_model(data.train, data.train_categories)
+    theories = Theory.learn_with_pruned_search_sweep(
+        case_model, settings, n_jobs=learning_n_jobs
+    )
+    training_runtime = time.time() - t1
+
+    columns = list(data.train.columns)
+    rows = []
+    for configuration, setting in zip(configurations, settings):
+        train_eval, _ = evaluate_rule_mining(
+            data.train,
+            data.train_categories,
+            data.target_col,
+            columns,
+            theory=theories[setting],
+            theory_file=theory_file(configuration),
+        )
+        train_eval["data_type"] = "train"
+        test_eval, _ = evaluate_rule_mining(
+            data.test,
+            data.test_categories,
+            data.target_col,
+            columns,
+            theory=theories[setting],
+            theory_file=None,
+        )
+        train_eval["training_runtime"] = test_eval["training_runtime"] = training_runtime
+        rows += [{**configuration, **train_eval}, {**configuration, **test_eval}]
+    return rows
+
+
+def model_tasks(
+    configurations: List[Dict[str, Any]],
+    data: PreparedData,
+    learning_n_jobs: Optional[int] = None,
+) -> List[Tuple[Callable[..., List[Dict[str, Any]]], Tuple[Any, ...]]]:
+    """
+    The tasks that evaluate configurations that share their preprocessing on their
+    prepared data: one per decision tree, and one sweep for all rule mining.
+    """
+    tasks: List[Tuple[Callable[..., List[Dict[str, Any]]], Tuple[Any, ...]]] = [
+        (run_decision_tree, (configuration, data))
+        for configuration in configurations
+        if configuration["model_type"] == "decision tree"
+    ]
+    rule_mining = [c for c in configurations if c["model_type"] == "rule mining"]
+    if rule_mining:
+        tasks.append((run_rule_mining, (rule_mining, data, learning_n_jobs)))
+    return tasks
+
+
+def configurations(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """One decision tree per preprocessing combination and one rule mining per full combination."""
+    preprocessing_grid = {p: grid[p] for p in PREPROCESSING_PARAMETERS}
+    return [
+        *[
+            {**configuration, "model_type": "decision tree"}
+            for configuration in parameter_grid(preprocessing_grid)
+        ],
+        *[
+            {**configuration, "model_type": "rule mining"}
+            for configuration in parameter_grid(grid)
+        ],
+    ]
+
+
+def configuration_key(row: Dict[str, Any], parameters: Iterable[str]) -> Tuple[str, ...]:
+    # written the same way as by the csv module, where None becomes an empty string
+    return tuple(
+        "" if row.get(parameter) is None else str(row.get(parameter))
+        for parameter in [*parameters, "model_type"]
+    )
+
+
+def groupby_preprocessing(
+    configurations: List[Dict[str, Any]]
+) -> Dict[Tuple[Any, ...], List[Dict[str, Any]]]:
+    groups: Dict[Tuple[Any, ...], List[Dict[str, Any]]] = dict()
+    for configuration in configurations:
+        key = tuple(configuration[parameter] for parameter in PREPROCESSING_PARAMETERS)
+        groups.setdefault(key, []).append(configuration)
+    return groups
+
+
+def no_bins_cache_file(output_file: str) -> str:
+    """The file next to the output file with the number of bins chosen for each column."""
+    return os.path.splitext(output_file)[0] + "_no_bins.pkl"
+
+
+def run_grid(
+    grid: Dict[str, Sequence[Any]],
+    output_file: str,
+    select_columns: ColumnSelection,
+    n_jobs: Optional[int] = None,
+    learning_n_jobs: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Runs all configurations of the grid that are not yet in the output file, on
+    `n_jobs` processes (all cores if None), and returns all results in the file.
+    The data of configurations that share their preprocessing is prepared once.
+    Then the decision tree and the rule mining are evaluated on it as separate
+    tasks, whose results are written as soon as each of them is done, so that a
+    model that fails does not hold back the others. The rule mining
+    configurations of a preprocessing combination are learned with one pruned
+    search sweep. The sweep runs on `learning_n_jobs` processes of its own (`-1`
+    for all cores), which pays off when there are fewer preprocessing
+    combinations than cores. The number of bins chosen for each column is kept
+    next to the output file, so that a resumed or repeated run skips the search
+    for it. `select_columns` must be a module-level function, so that it can be
+    pickled.
+    """
+    fields = [*grid.keys(), *RESULT_FIELDS]
+    done = set()
+    if os.path.exists(output_file):
+        with open(output_file, newline="") as file:
+            done = {configuration_key(row, grid.keys()) for row in csv.DictReader(file)}
+    todo = [
+        configuration
+        for configuration in configurations(grid)
+        if configuration_key(configuration, grid.keys()) not in done
+    ]
+
+    with open(output_file, "a", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fields, extrasaction="ignore")
+        if file.tell() == 0:
+            writer.writeheader()
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            # the data of each preprocessing combination is prepared first, and
+            # then its models are evaluated on it as separate tasks
+            pending = {
+                executor.submit(
+                    prepare_data, *key, select_columns, no_bins_cache_file(output_file)
+                ): group
+                for key, group in groupby_preprocessing(todo).items()
+            }
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print("Exception %s %s" % (task, e))
+                        continue
+                    if isinstance(result, PreparedData):
+                        for function, args in model_tasks(task, result, learning_n_jobs):
+                            pending[executor.submit(function, *args)] = args[0]
+                        continue
+                    writer.writerows(result)
+                    file.flush()
+                    print(*result, sep="\n")
+    return pd.read_csv(output_file)
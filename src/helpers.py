@@ -1,6 +1,4 @@
 from typing import *
-import pandas as pd
-import collections
 
 A = TypeVar("A")
 B = TypeVar("B")
@@ -3,6 +3,10 @@ from queuelib.queue import FifoMemoryQueue
 from itertools import *
 from helpers import subset, histogram, unique
 from fractions import Fraction
+from bisect import bisect_left
+from heapq import heappush, heappop
+import numpy as np
+import time
 
 Fact = str
 X = List[List[Fact]]
@@ -12,14 +16,75 @@ Conclusion = Fact
 Rule = Tuple[Premise, Conclusion]
 Position = Fraction
 Theory = List[Tuple[Rule, Position]]
+AnyBaseline = Union["Baseline", "VectorisedBaseline"]
 
 
-def defeasible_theory_search(x: X, y: Y) -> Theory:
+def defeasible_theory_search(
+    x: X,
+    y: Y,
+    best_first: bool = False,
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Theory:
+    premise_literals: List[Fact] = unique(list(chain(*x)))
+    conclusion_literals: List[Fact] = unique(y)
+    return theory_search(
+        premise_literals,
+        conclusion_literals,
+        lambda theory: Baseline(theory, x, y),
+        best_first,
+        max_nodes,
+        timeout,
+    )
+
+
+def vectorised_defeasible_theory_search(
+    x: X,
+    y: Y,
+    best_first: bool = False,
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Theory:
+    """
+    Same as `defeasible_theory_search`, but the examples are encoded once into a
+    boolean matrix of literals, and candidate rules are scored with NumPy.
+    """
     premise_literals: List[Fact] = unique(list(chain(*x)))
     conclusion_literals: List[Fact] = unique(y)
+    examples = EncodedExamples(x, y, premise_literals, conclusion_literals)
+    return theory_search(
+        premise_literals,
+        conclusion_literals,
+        lambda theory: VectorisedBaseline(theory, examples),
+        best_first,
+        max_nodes,
+        timeout,
+    )
+
+
+def theory_search(
+    premise_literals: List[Fact],
+    conclusion_literals: List[Fact],
+    baseline_of: Callable[[Theory], AnyBaseline],
+    best_first: bool = False,
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Theory:
+    # `max_nodes` and `timeout` limit each best-first rule search.
     theory: Theory = []
     while True:
-        rule = rule_search(premise_literals, conclusion_literals, theory, x, y)
+        baseline = baseline_of(theory)
+        if best_first:
+            rule = best_first_rule_search(
+                premise_literals,
+                conclusion_literals,
+                theory,
+                baseline,
+                max_nodes,
+                timeout,
+            )
+        else:
+            rule = rule_search(premise_literals, conclusion_literals, theory, baseline)
         if rule is None:
             break
         theory = [*theory, rule]
@@ -31,28 +96,95 @@ def rule_search(
     premise_literals: List[Fact],
     conclusion_literals: List[Fact],
     theory: Theory,
-    x: X,
-    y: Y,
+    baseline: AnyBaseline,
 ) -> Optional[Tuple[Rule, Fraction]]:
-    best_gain = 0.0
+    best_gain = 0
     best_rule, position_of_best_rule = None, None
     for position in positions(theory):
         # print(position)
-        weaker = [(r, p) for (r, p) in theory if p < position]
-        stronger = [(r, p) for (r, p) in theory if p > position]
-        queue = FifoMemoryQueue()  # Type: Queue of lists of facts
-        queue.push([])
+        queue = FifoMemoryQueue()  # Type: Queue of (premise, examples covered by its parent)
+        queue.push(([], None))
         while len(queue) > 0:
-            premise = queue.pop()
+            premise, covered_by_parent = queue.pop()
+            covered = baseline.covered(premise, covered_by_parent)
             conclusion, gain_, max_gain_ = compute(
-                premise, position, conclusion_literals, theory, x, y
+                premise, position, conclusion_literals, baseline, covered
             )
             if gain_ > best_gain:
                 best_gain = gain_
                 best_rule, position_of_best_rule = (premise, conclusion), position
             if max_gain_ > best_gain:
                 for refinement in refinements(premise_literals, premise):
-                    queue.push(refinement)
+                    queue.push((refinement, covered))
+    if best_gain > 0:
+        assert best_rule is not None
+        assert position_of_best_rule is not None
+        return best_rule, position_of_best_rule
+    else:
+        return None
+
+
+def best_first_rule_search(
+    premise_literals: List[Fact],
+    conclusion_literals: List[Fact],
+    theory: Theory,
+    baseline: AnyBaseline,
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Optional[Tuple[Rule, Fraction]]:
+    """
+    Branch and bound variant of `rule_search`: premises are expanded in order of
+    the `max_gain` of their parent, an upper bound for their own gain, and the
+    search ends when no remaining bound can beat the best rule found so far.
+
+    Each premise set is enumerated once, with its literals in the order of
+    `premise_literals`. Premises of equal gain are ranked by (position,
+    length, literals), which is the order in which the breadth-first search
+    meets them, so both searches find the same rule. With `max_nodes` or
+    `timeout` (in seconds), the best rule found within the budget is returned.
+
+    Gains and bounds are compared as counts of examples, like in `compute`, so
+    that a gain is never above the bound of its parent through rounding.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    positions_ = positions(theory)
+    best_gain = 0
+    best_key: Optional[Tuple[int, int, Tuple[int, ...]]] = None
+    best_rule, position_of_best_rule = None, None
+
+    def can_beat_best(bound: float, key: Tuple[int, int, Tuple[int, ...]]) -> bool:
+        return bound > best_gain or (
+            best_key is not None and bound == best_gain and key < best_key
+        )
+
+    # Type: Heap of (-bound, position index, premise length, literal indices,
+    # examples covered by the parent premise)
+    heap: List[Tuple[float, int, int, Tuple[int, ...], Any]] = [
+        (-float("inf"), i, 0, (), None) for i in range(len(positions_))
+    ]
+    nodes = 0
+    while len(heap) > 0:
+        bound, i, length, indices, covered_by_parent = heappop(heap)
+        key = (i, length, indices)
+        if not can_beat_best(-bound, key):
+            break
+        if (max_nodes is not None and nodes >= max_nodes) or (
+            deadline is not None and time.monotonic() > deadline
+        ):
+            break
+        nodes += 1
+        premise = [premise_literals[j] for j in indices]
+        covered = baseline.covered(premise, covered_by_parent)
+        conclusion, gain_, max_gain_ = compute(
+            premise, positions_[i], conclusion_literals, baseline, covered
+        )
+        if can_beat_best(gain_, key):
+            best_gain, best_key = gain_, key
+            best_rule, position_of_best_rule = (premise, conclusion), positions_[i]
+        if can_beat_best(max_gain_, key):
+            start = indices[-1] + 1 if indices else 0
+            for j in range(start, len(premise_literals)):
+                heappush(heap, (-max_gain_, i, length + 1, (*indices, j), covered))
     if best_gain > 0:
         assert best_rule is not None
         assert position_of_best_rule is not None
@@ -61,6 +193,167 @@ def rule_search(
         return None
 
 
+class Baseline:
+    """
+    The predictions of the current theory for every example. Adding a rule only
+    changes the predictions for the examples covered by its premise, so
+    candidate rules are scored on those examples only, as a delta against this.
+    """
+
+    def __init__(self, theory: Theory, x: X, y: Y):
+        self.x = [set(facts) for facts in x]
+        self.y = y
+        self.strongest = [strongest_applicable_rules(facts, theory) for facts in x]
+        self.predictions = [predict_from(strongest) for strongest in self.strongest]
+        self.correct = sum(
+            [1 for prediction, y_ in zip(self.predictions, y) if prediction == y_]
+        )
+
+    def covered(self, premise: Premise, covered_by_parent: Optional[List[int]]) -> List[int]:
+        # a refinement adds a single literal to the premise of its parent
+        if covered_by_parent is None:
+            return [i for i, facts in enumerate(self.x) if subset(premise, facts)]
+        literal = premise[-1]
+        return [i for i in covered_by_parent if literal in self.x[i]]
+
+    def predict_with(self, i: int, rule: Rule, position: Position) -> Optional[Conclusion]:
+        # prediction for the i-th example after adding a rule that applies to it
+        strongest = self.strongest[i]
+        if strongest is None or position > strongest[0]:
+            return rule[1]
+        elif position == strongest[0]:
+            return rule[1] if strongest[1] == {rule[1]} else None
+        else:
+            return self.predictions[i]
+
+    def gains(
+        self, rule: Rule, position: Position, covered: List[int]
+    ) -> Tuple[float, float]:
+        # same as `gain` and `max_gain`, without predicting the whole data set
+        gain_, max_gain_ = self.counts(rule, position, covered)
+        n = len(self.y)
+        return (self.correct + gain_) / n - self.correct / n, max_gain_ / n
+
+    def counts(
+        self, rule: Rule, position: Position, covered: List[int]
+    ) -> Tuple[int, int]:
+        # `gain` and `max_gain` as numbers of examples
+        fixed, broken = 0, 0
+        for i in covered:
+            was_correct = self.predictions[i] == self.y[i]
+            is_correct = self.predict_with(i, rule, position) == self.y[i]
+            if is_correct and not was_correct:
+                fixed += 1
+            elif was_correct and not is_correct:
+                broken += 1
+        return fixed - broken, fixed
+
+    def scores(
+        self,
+        premise: Premise,
+        position: Position,
+        conclusion_literals: List[Fact],
+        covered: List[int],
+    ) -> List[Tuple[Conclusion, int, int]]:
+        return [
+            (c, *self.counts((premise, c), position, covered))
+            for c in conclusion_literals
+        ]
+
+
+class EncodedExamples:
+    """
+    The examples as a boolean matrix with one row per premise literal and one
+    column per example, and the labels as indices into the conclusion literals.
+    """
+
+    def __init__(
+        self, x: X, y: Y, premise_literals: List[Fact], conclusion_literals: List[Fact]
+    ):
+        self.literal_ids = {literal: j for j, literal in enumerate(premise_literals)}
+        self.conclusion_ids = {c: k for k, c in enumerate(conclusion_literals)}
+        self.literals = np.zeros((len(premise_literals), len(x)), dtype=bool)
+        for i, facts in enumerate(x):
+            self.literals[[self.literal_ids[fact] for fact in facts], i] = True
+        self.y = np.array([self.conclusion_ids[y_] for y_ in y], dtype=np.intp)
+
+    def covered(self, premise: Premise) -> np.ndarray:
+        covered = np.ones(len(self.y), dtype=bool)
+        for literal in premise:
+            covered &= self.literals[self.literal_ids[literal]]
+        return covered
+
+
+class VectorisedBaseline:
+    """
+    Like `Baseline`, on encoded examples. For every example, it stores the rank
+    of the position of its strongest applicable rules (-1 if there is none) and
+    the index of the predicted conclusion (-1 if there is no prediction).
+    """
+
+    def __init__(self, theory: Theory, examples: EncodedExamples):
+        self.examples = examples
+        self.positions = sorted({position for _, position in theory})
+        n = len(examples.y)
+        self.strongest = np.full(n, -1, dtype=np.intp)
+        self.predictions = np.full(n, -1, dtype=np.intp)
+        for (premise, conclusion), position in theory:
+            applies = examples.covered(premise)
+            rank = self.positions.index(position)
+            c = examples.conclusion_ids[conclusion]
+            stronger = applies & (self.strongest < rank)
+            # rules of equal strength with different conclusions cancel out
+            conflicting = applies & (self.strongest == rank) & (self.predictions != c)
+            self.strongest[stronger] = rank
+            self.predictions[stronger] = c
+            self.predictions[conflicting] = -1
+        self.is_correct = self.predictions == examples.y
+        self.correct = int(self.is_correct.sum())
+        self.changed_by: Dict[Position, Tuple[np.ndarray, np.ndarray]] = dict()
+
+    def covered(self, premise: Premise, covered_by_parent: Optional[np.ndarray]) -> np.ndarray:
+        if covered_by_parent is None:
+            return self.examples.covered(premise)
+        literal = self.examples.literal_ids[premise[-1]]
+        return covered_by_parent & self.examples.literals[literal]
+
+    def changed_by_rules_at(self, position: Position) -> Tuple[np.ndarray, np.ndarray]:
+        # Examples where a new rule at this position overrides the prediction,
+        # and examples where it joins rules of the same strength.
+        if position not in self.changed_by:
+            rank = bisect_left(self.positions, position)
+            overridden = self.strongest < rank
+            if rank < len(self.positions) and self.positions[rank] == position:
+                joined = self.strongest == rank
+            else:
+                joined = np.zeros_like(overridden)
+            self.changed_by[position] = overridden, joined
+        return self.changed_by[position]
+
+    def scores(
+        self,
+        premise: Premise,
+        position: Position,
+        conclusion_literals: List[Fact],
+        covered: np.ndarray,
+    ) -> List[Tuple[Conclusion, int, int]]:
+        overridden, joined = self.changed_by_rules_at(position)
+        overridden = overridden & covered
+        y = self.examples.y
+        k = len(conclusion_literals)
+        # Overridden examples now predict the new conclusion. Joined examples
+        # keep their prediction if it is the new conclusion and predict nothing
+        # otherwise, so they cannot be fixed, only broken.
+        fixed = np.bincount(y[overridden & ~self.is_correct], minlength=k)
+        at_risk = (overridden | (joined & covered)) & self.is_correct
+        kept = np.bincount(y[at_risk], minlength=k)
+        broken = int(at_risk.sum()) - kept
+        return [
+            (c, int(fixed[i]) - int(broken[i]), int(fixed[i]))
+            for i, c in enumerate(conclusion_literals)
+        ]
+
+
 def positions(theory: Theory) -> List[Position]:
     if len(theory) == 0:
         return [Fraction(0)]
@@ -78,24 +371,14 @@ def compute(
     premise: Premise,
     position: Position,
     conclusion_literals: List[Fact],
-    theory: Theory,
-    x: X,
-    y: Y,
-) -> Tuple[Conclusion, float, float]:
-    preferred_conclusion, gain_, _ = max(
-        [
-            (
-                c,
-                gain((premise, c), position, theory, x, y),
-                max_gain((premise, c), position, theory, x, y),
-            )
-            for c in conclusion_literals
-        ],
-        key=lambda x: (x[1], x[2]),
-    )
-    max_gain_ = max(
-        [max_gain((premise, c), position, theory, x, y) for c in conclusion_literals]
-    )
+    baseline: AnyBaseline,
+    covered: Any,
+) -> Tuple[Conclusion, int, int]:
+    # The gain and the maximal gain as numbers of examples, that is multiplied by
+    # the number of examples, so that they are compared exactly.
+    scores = baseline.scores(premise, position, conclusion_literals, covered)
+    preferred_conclusion, gain_, _ = max(scores, key=lambda x: (x[1], x[2]))
+    max_gain_ = max([max_gain_ for _, _, max_gain_ in scores])
     return preferred_conclusion, gain_, max_gain_
 
 
@@ -122,6 +405,12 @@ def max_gain(rule: Rule, position: Position, theory: Theory, x: X, y: Y):
 
 
 def predict(facts: List[Fact], theory: Theory) -> Optional[Conclusion]:
+    return predict_from(strongest_applicable_rules(facts, theory))
+
+
+def strongest_applicable_rules(
+    facts: Iterable[Fact], theory: Theory
+) -> Optional[Tuple[Position, Set[Conclusion]]]:
     applicable_rules = [
         ((premise, conclusion), position)
         for (premise, conclusion), position in theory
@@ -129,23 +418,29 @@ def predict(facts: List[Fact], theory: Theory) -> Optional[Conclusion]:
     ]
     if len(applicable_rules) == 0:
         return None
-    strongest_applicable_position = max(applicable_rules, key=lambda x: x[1    ])[1]
-    strongest_applicable_rules = [
-        (rule, position)
-        for rule, position in applicable_rules
-        if position == strongest_applicable_position
-    ]
+    strongest_applicable_position = max(applicable_rules, key=lambda x: x[1])[1]
     conclusions = {
-        conclusion for (premise, conclusion), position in strongest_applicable_rules
+        conclusion
+        for (premise, conclusion), position in applicable_rules
+        if position == strongest_applicable_position
     }
-    if len(conclusions) == 1:
-        return list(conclusions)[0]
+    return strongest_applicable_position, conclusions
+
+
+def predict_from(
+    strongest: Optional[Tuple[Position, Set[Conclusion]]]
+) -> Optional[Conclusion]:
+    if strongest is not None and len(strongest[1]) == 1:
+        return list(strongest[1])[0]
     else:
         return None
 
 
 def refinements(literals: List[Fact], premise: Premise) -> List[Premise]:
-    return [[*premise, literal] for literal in literals if literal not in premise]
+    # Only literals after the last one of the premise are added, so that every
+    # set of literals is reached once, as the premise with its literals in order.
+    start = literals.index(premise[-1]) + 1 if len(premise) > 0 else 0
+    return [[*premise, literal] for literal in literals[start:]]
 
 
 # main()
@@ -1,8 +1,16 @@
 from load_data import load_csv_data, bin_data_set
 from sklearn.model_selection import train_test_split
-from hero import defeasible_theory_search
+from hero import (
+    defeasible_theory_search,
+    vectorised_defeasible_theory_search,
+    positions,
+    gain,
+    max_gain,
+    Baseline,
+)
 from learning import Theory
 from logic import CaseModel
+from fractions import Fraction
 
 
 def test_example_1():
@@ -10,11 +18,28 @@ def test_example_1():
     y = ["d", "not d", "d"]
     theory = defeasible_theory_search(x, y)
     rules = [rule for rule, _ in theory]
+    assert vectorised_defeasible_theory_search(x, y) == theory
     assert len(rules) == 2
     assert ([], "d") in rules
     assert (["b", "not c"], "not d") in rules
 
 
+def test_incremental_gains():
+    x = [["a", "b", "c"], ["a", "b", "not c"], ["a", "not b", "not c"], ["not a", "b"]]
+    y = ["d", "not d", "d", "not d"]
+    theory = [(([], "d"), Fraction(0)), ((["b"], "not d"), Fraction(1, 2))]
+    baseline = Baseline(theory, x, y)
+    for premise in [[], ["a"], ["b"], ["a", "not c"], ["not a", "b"]]:
+        covered = baseline.covered(premise, None)
+        for position in positions(theory):
+            for conclusion in ["d", "not d"]:
+                rule = (premise, conclusion)
+                assert baseline.gains(rule, position, covered) == (
+                    gain(rule, position, theory, x, y),
+                    max_gain(rule, position, theory, x, y),
+                )
+
+
 def test_case_model_1():
     case_model = CaseModel.fromStr([(1, "sus, ¬mis, wit"), (0, "mis, wit")])
     theory = Theory.learn_with_hero(case_model)
@@ -48,3 +73,28 @@ def test_data_set():
     for rule, _ in theory:
         print(rule)
     assert len(theory) > 0
+    assert vectorised_defeasible_theory_search(x, y) == theory
+    assert defeasible_theory_search(x, y, best_first=True) == theory
+    assert vectorised_defeasible_theory_search(x, y, best_first=True) == theory
+
+
+def test_best_first_search_with_budget():
+    x = [["a", "b", "c"], ["a", "b", "not c"], ["a", "not b", "not c"]]
+    y = ["d", "not d", "d"]
+    theory = defeasible_theory_search(x, y)
+    assert defeasible_theory_search(x, y, best_first=True) == theory
+    # with one node per rule search, only the empty premise is ever evaluated
+    theory = defeasible_theory_search(x, y, best_first=True, max_nodes=1)
+    assert [rule for rule, _ in theory] == [([], "d")]
+
+
+def test_best_first_search_with_equal_gains():
+    # gains like (correct + 2) / 120 - correct / 120 are above 2 / 120 by rounding,
+    # and equal rules must not be pruned by that
+    df = bin_data_set(load_csv_data("BostonHousing.csv"), n_bins=3)
+    df = df[list(df.columns[9:14])].sample(120, random_state=3)
+    rows = df.values.tolist()
+    x, y = [row[:-1] for row in rows], [row[-1] for row in rows]
+    theory = defeasible_theory_search(x, y)
+    assert defeasible_theory_search(x, y, best_first=True) == theory
+    assert vectorised_defeasible_theory_search(x, y, best_first=True) == theory
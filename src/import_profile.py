@@ -0,0 +1,68 @@
+"""
+Reports what importing a module loads, for `python main.py --profile-import`.
+
+Every module is imported in a fresh interpreter with `python -X importtime`, so
+the report shows the cost of a cold start, like that of a short-lived worker
+that only scores with a learned theory. The import time is summed per top-level
+package, and the heavy dependencies that were loaded are named. `logic`,
+`learning` and `hero` should load none of them; pandas, scikit-learn, skopt and
+matplotlib are only imported by the functions that use them.
+"""
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import *
+
+CORE_MODULES = ("logic", "learning", "hero")
+HEAVY_PACKAGES = ("pandas", "scipy", "sklearn", "skopt", "matplotlib")
+
+
+@dataclass
+class ImportProfile:
+    module: str
+    # microseconds spent importing each top-level package, by itself
+    packages: Dict[str, int]
+
+    @property
+    def total(self) -> int:
+        return sum(self.packages.values())
+
+    @property
+    def heavy(self) -> List[str]:
+        return [package for package in HEAVY_PACKAGES if package in self.packages]
+
+    def report(self, top: int = 5) -> str:
+        slowest = sorted(self.packages.items(), key=lambda item: -item[1])[:top]
+        return "\n".join(
+            [
+                "%s: %.1f ms, heavy dependencies: %s"
+                % (self.module, self.total / 1000, ", ".join(self.heavy) or "none"),
+                *["    %-24s %8.1f ms" % (package, time / 1000) for package, time in slowest],
+            ]
+        )
+
+
+def profile_import(module: str) -> ImportProfile:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    packages: Dict[str, int] = dict()
+    # lines like "import time:       466 |     429235 |     helpers", after a header
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:"):
+            line = line[len("import time:"):]
+        fields = line.split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        package = fields[2].strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(fields[0])
+    return ImportProfile(module, packages)
+
+
+def profile_imports(modules: Iterable[str] = CORE_MODULES) -> str:
+    return "\n\n".join(profile_import(module).report() for module in modules)
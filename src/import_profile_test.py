@@ -0,0 +1,8 @@
+from import_profile import CORE_MODULES, profile_import
+
+
+def test_core_modules_do_not_import_heavy_dependencies():
+    for module in [*CORE_MODULES, "dataPreProcessing.dataPreProcessor"]:
+        profile = profile_import(module)
+        assert module.split(".")[0] in profile.packages
+        assert profile.heavy == [], profile.report()
@@ -3,7 +3,13 @@ from learning_helpers import *
 from typing import *
 from itertools import *
 from operator import attrgetter
-from hero import defeasible_theory_search
+from concurrent.futures import ProcessPoolExecutor
+from hero import vectorised_defeasible_theory_search
+import os
+from math import inf
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 @dataclass
@@ -33,7 +39,13 @@ class Theory:
         return s
 
     def __add__(self, other):
-        return self.union([self, other])
+        return self.union(self, other)
+
+    def extend(self, other: "Theory"):
+        """Adds the arguments of the other theory, without sorting them."""
+        self.conclusive_arguments += other.conclusive_arguments
+        self.presumptively_valid_arguments += other.presumptively_valid_arguments
+        self.coherent_arguments += other.coherent_arguments
 
     @property
     def size(self):
@@ -88,7 +100,7 @@ class Theory:
                 [str(f) for f in case.facts if f.statement == fact][0]
                 for case in relevant_cases
             ]
-            rules += defeasible_theory_search(x, y)
+            rules += vectorised_defeasible_theory_search(x, y)
         theory = Theory(
             [],
             [
@@ -101,30 +113,24 @@ class Theory:
 
     @staticmethod
     def learn_with_naive_search(case_model: CaseModel) -> "Theory":
-        theory = Theory([], [], [])
-        for argument in candidate_arguments(case_model.namesAndCategories): 
+        # The candidates arrive in order of the number of their premises,
+        # so each one is filtered for relevance as soon as it is classified.
+        relevance = RelevanceFilter()
+        arguments: Tuple[List[Argument], ...] = ([], [], [])
+        for argument in candidate_arguments(case_model):
             if argument.is_conclusive_in(case_model):
-                theory.conclusive_arguments.append(argument)
+                kind = 0
             elif argument.is_presumptively_valid_in(case_model):
-                theory.presumptively_valid_arguments.append(argument)
-            elif argument.is_coherent_in(case_model):
-                theory.coherent_arguments.append(argument)
-        return Theory(
-            postprocess(theory.conclusive_arguments),
-            postprocess(theory.presumptively_valid_arguments),
-            postprocess(theory.coherent_arguments),
-        )
+                kind = 1
+            else:
+                kind = 2
+            if relevance.add(argument, kind):
+                arguments[kind].append(argument)
+        return Theory(*[join_arguments(kind) for kind in arguments])
 
     @staticmethod
     def union(*theories: "Theory") -> "Theory":
-        def _union(argumentLists: List[List[Argument]]) -> List[Argument]:
-            return sorted(it.chain(*argumentLists), key=str)
-
-        return Theory(
-            _union([theory.conclusive_arguments for theory in theories]),
-            _union([theory.presumptively_valid_arguments for theory in theories]),
-            _union([theory.coherent_arguments for theory in theories]),
-        )
+        return TheoryBuilder().add(*theories).build()
 
     @staticmethod
     def learn_with_pruned_search(
@@ -132,20 +138,95 @@ class Theory:
         depth: int = 5,
         max_premise_size: Optional[int] = None,
         log: bool = False,
+        n_jobs: Optional[int] = None,
+        record: Optional["SearchRecord"] = None,
     ) -> "Theory":
-        theory = Theory.union(
-            *[
+        # The searches for the different conclusions are independent,
+        # so they can run in parallel (`n_jobs=-1` uses all cores).
+        # A record of earlier searches on the same case model is only used
+        # when searching serially.
+        candidates = list(case_model.schema.facts)
+        if n_jobs is None or n_jobs == 1:
+            theories = [
                 Theory.init_pruned_search(
-                    candidate, case_model, depth, max_premise_size, log
+                    candidate, case_model, depth, max_premise_size, log, record
                 )
-                for candidate in fact_candidates(case_model.namesAndCategories)
+                for candidate in candidates
             ]
-        )
-        return Theory(
-            join_arguments(theory.conclusive_arguments),
-            join_arguments(theory.presumptively_valid_arguments),
-            join_arguments(theory.coherent_arguments),
-        )
+        else:
+            with ProcessPoolExecutor(
+                max_workers=os.cpu_count() if n_jobs < 0 else n_jobs,
+                initializer=_set_worker_case_model,
+                initargs=(case_model,),
+            ) as executor:
+                theories = list(
+                    executor.map(
+                        _init_pruned_search_in_worker,
+                        candidates,
+                        repeat(depth),
+                        repeat(max_premise_size),
+                        repeat(log),
+                    )
+                )
+        return TheoryBuilder().add(*theories).build_joined()
+
+    @staticmethod
+    def learn_with_pruned_search_sweep(
+        case_model: CaseModel,
+        settings: Iterable[Tuple[int, Optional[int]]],
+        log: bool = False,
+        n_jobs: Optional[int] = None,
+    ) -> Dict[Tuple[int, Optional[int]], "Theory"]:
+        """
+        Learns a theory for every `(depth, max_premise_size)` setting. The searches
+        share a record, so that parts of a search that do not depend on the
+        setting are done only once. When searching in parallel, each conclusion is
+        swept in one process, with a record of its own.
+        """
+        settings = list(settings)
+        candidates = list(case_model.schema.facts)
+        if n_jobs is None or n_jobs == 1:
+            record = SearchRecord()
+            sweeps = [
+                Theory.init_pruned_search_sweep(
+                    candidate, case_model, settings, log, record
+                )
+                for candidate in candidates
+            ]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=os.cpu_count() if n_jobs < 0 else n_jobs,
+                initializer=_set_worker_case_model,
+                initargs=(case_model,),
+            ) as executor:
+                sweeps = list(
+                    executor.map(
+                        _init_pruned_search_sweep_in_worker,
+                        candidates,
+                        repeat(settings),
+                        repeat(log),
+                    )
+                )
+        return {
+            setting: TheoryBuilder().add(*[sweep[i] for sweep in sweeps]).build_joined()
+            for i, setting in enumerate(settings)
+        }
+
+    @staticmethod
+    def init_pruned_search_sweep(
+        conclusion: Fact,
+        case_model: CaseModel,
+        settings: List[Tuple[int, Optional[int]]],
+        log: bool,
+        record: Optional["SearchRecord"] = None,
+    ) -> List["Theory"]:
+        record = record if record is not None else SearchRecord()
+        return [
+            Theory.init_pruned_search(
+                conclusion, case_model, depth, max_premise_size, log, record
+            )
+            for depth, max_premise_size in settings
+        ]
 
     @staticmethod
     def init_pruned_search(
@@ -154,15 +235,23 @@ class Theory:
         depth: int,
         max_premise_size: Optional[int],
         log: bool,
+        record: Optional["SearchRecord"] = None,
     ) -> "Theory":
         if log:
             print("learning", conclusion, "...")
+        if record is not None:
+            recorded = record.get([], conclusion, depth, max_premise_size)
+            if recorded is not None:
+                return recorded[1]
+        bounds = SearchBounds()
         theory = Theory([], [], [])
         argument = Argument([], [conclusion])
         if argument.is_conclusive_in(case_model):
             theory.conclusive_arguments.append(argument)
         else:
-            if argument.is_presumptively_valid_in(case_model) and depth > 0:
+            if argument.is_presumptively_valid_in(case_model) and bounds.depth_above(
+                depth, 0
+            ):
                 theory.presumptively_valid_arguments.append(argument)
                 # Searching for exceptions to this is already taken care of
                 # by calling `init_pruned_search` on the negated conclusion.
@@ -170,8 +259,17 @@ class Theory:
                 theory.coherent_arguments.append(argument)
             if argument.is_coherent_in(case_model):
                 theory = Theory.pruned_search(
-                    [], conclusion, case_model, theory, depth, max_premise_size
+                    [],
+                    conclusion,
+                    case_model,
+                    theory,
+                    depth,
+                    max_premise_size,
+                    record,
+                    bounds,
                 )
+        if record is not None:
+            record.add([], conclusion, bounds, theory)
         return theory
 
     @staticmethod
@@ -182,14 +280,30 @@ class Theory:
         theory: "Theory",
         depth: int,
         max_premise_size: Optional[int],
+        record: Optional["SearchRecord"] = None,
+        bounds: Optional["SearchBounds"] = None,
     ) -> "Theory":
+        """
+        Searches arguments for the conclusion, with the given premises and more.
+        The settings for which the search would take the same course are narrowed
+        down in `bounds`. Searches for exceptions are looked up in and added to
+        the record, if there is one.
+        """
+        bounds = bounds if bounds is not None else SearchBounds()
         premise_size = 1
         premise_candidates = premise_candidates_(conclusion, premises, case_model)
-        while len(premise_candidates) > 0 and (
-            (premise_size <= max_premise_size) if max_premise_size is not None else True
+        # Premises of the previous size that are not coherent. If one of them is a
+        # subset of a candidate, the candidate is not coherent either.
+        incoherent_premises: Set[FrozenSet[Fact]] = set()
+        while len(premise_candidates) > 0 and bounds.size_within(
+            premise_size, max_premise_size
         ):
             next_premise_candidates = []
+            next_incoherent_premises = set()
             for subset in premise_candidates:
+                if has_subset_in(subset, incoherent_premises):
+                    next_incoherent_premises.add(frozenset(subset))
+                    continue
                 argument = Argument(list(subset), [conclusion])
                 if argument.is_conclusive_in(case_model) and (
                     not argument.is_overly_specific(theory.conclusive_arguments)
@@ -201,34 +315,71 @@ class Theory:
                         theory.conclusive_arguments
                         + theory.presumptively_valid_arguments
                     )
+                    is_coherent = argument.is_coherent_in(case_model)
                     if (
                         argument.is_presumptively_valid_in(case_model)
                         and not argument.is_overly_specific(earlier_args)
-                        and depth > 0
+                        and bounds.depth_above(depth, 0)
                     ):
                         theory.presumptively_valid_arguments.append(argument)
-                        if depth > 1:
-                            # Search for exceptions.
-                            theory = Theory.union(
-                                theory,
-                                *[
-                                    Theory.pruned_search(
+                        if bounds.depth_above(depth, 1):
+                            # Search for exceptions. The arguments are only
+                            # sorted once the search is done.
+                            for category in conclusion.other_categories:
+                                theory.extend(
+                                    Theory.search_exceptions(
                                         list(subset),
                                         category,
                                         case_model,
-                                        Theory([], [], []),
                                         depth - 1,
                                         max_premise_size,
+                                        record,
+                                        bounds,
                                     )
-                                    for category in conclusion.other_categories
-                                ],
-                            )
-                    elif argument.is_coherent_in(case_model):
+                                )
+                    elif is_coherent:
                         theory.coherent_arguments.append(argument)
-                    if argument.is_coherent_in(case_model):
+                    if is_coherent:
                         next_premise_candidates.append(subset)
+                    else:
+                        next_incoherent_premises.add(frozenset(subset))
             premise_size += 1
             premise_candidates = more_specific_sets(next_premise_candidates)
+            incoherent_premises = next_incoherent_premises
+        return theory
+
+    @staticmethod
+    def search_exceptions(
+        premises: List[Fact],
+        conclusion: Fact,
+        case_model: CaseModel,
+        depth: int,
+        max_premise_size: Optional[int],
+        record: Optional["SearchRecord"],
+        bounds: "SearchBounds",
+    ) -> "Theory":
+        recorded = (
+            record.get(premises, conclusion, depth, max_premise_size)
+            if record is not None
+            else None
+        )
+        if recorded is not None:
+            exception_bounds, theory = recorded
+        else:
+            exception_bounds = SearchBounds()
+            theory = Theory.pruned_search(
+                premises,
+                conclusion,
+                case_model,
+                Theory([], [], []),
+                depth,
+                max_premise_size,
+                record,
+                exception_bounds,
+            )
+            if record is not None:
+                record.add(premises, conclusion, exception_bounds, theory)
+        bounds.include_exceptions(exception_bounds)
         return theory
 
     def is_defeated(
@@ -239,7 +390,7 @@ class Theory:
         other_arguments: List[Argument],
     ):
         prediction = self.apply_argument(unknown_fact, argument)
-        any(
+        return any(
             [
                 self.is_more_specific(other_argument, argument)
                 and self.is_applicable(known_facts, unknown_fact, other_argument)
@@ -261,3 +412,246 @@ class Theory:
     @staticmethod
     def is_more_specific(a: Argument, b: Argument) -> bool:
         return subset(b.premises, a.premises)
+
+
+class TheoryBuilder:
+    """
+    Collects the arguments of theories, without duplicates. The arguments are
+    only sorted when the theory is built, instead of on every union.
+    """
+
+    def __init__(self):
+        self.conclusive_arguments = ArgumentSet()
+        self.presumptively_valid_arguments = ArgumentSet()
+        self.coherent_arguments = ArgumentSet()
+
+    def add(self, *theories: Theory) -> "TheoryBuilder":
+        for theory in theories:
+            self.conclusive_arguments.extend(theory.conclusive_arguments)
+            self.presumptively_valid_arguments.extend(
+                theory.presumptively_valid_arguments
+            )
+            self.coherent_arguments.extend(theory.coherent_arguments)
+        return self
+
+    def build(self) -> Theory:
+        return Theory(
+            self.conclusive_arguments.sorted(),
+            self.presumptively_valid_arguments.sorted(),
+            self.coherent_arguments.sorted(),
+        )
+
+    def build_joined(self) -> Theory:
+        """The theory with the arguments from the same premises joined into one."""
+        return Theory(
+            self.conclusive_arguments.joined(),
+            self.presumptively_valid_arguments.joined(),
+            self.coherent_arguments.joined(),
+        )
+
+
+@dataclass
+class SearchBounds:
+    """
+    The depths and maximum premise sizes (None counting as infinite) for which a
+    pruned search takes the same course and finds the same theory. They are
+    narrowed down whenever the search compares its setting with something.
+    """
+
+    min_depth: float = -inf
+    max_depth: float = inf
+    min_premise_size: float = -inf
+    max_premise_size: float = inf
+
+    def depth_above(self, depth: int, threshold: int) -> bool:
+        if depth > threshold:
+            self.min_depth = max(self.min_depth, threshold + 1)
+            return True
+        self.max_depth = min(self.max_depth, threshold)
+        return False
+
+    def size_within(self, premise_size: int, max_premise_size: Optional[int]) -> bool:
+        if max_premise_size is None or premise_size <= max_premise_size:
+            self.min_premise_size = max(self.min_premise_size, premise_size)
+            return True
+        self.max_premise_size = min(self.max_premise_size, premise_size - 1)
+        return False
+
+    def include_exceptions(self, other: "SearchBounds") -> None:
+        # the search for exceptions runs with one less depth
+        self.min_depth = max(self.min_depth, other.min_depth + 1)
+        self.max_depth = min(self.max_depth, other.max_depth + 1)
+        self.min_premise_size = max(self.min_premise_size, other.min_premise_size)
+        self.max_premise_size = min(self.max_premise_size, other.max_premise_size)
+
+    def contain(self, depth: int, max_premise_size: Optional[int]) -> bool:
+        size = inf if max_premise_size is None else max_premise_size
+        return (
+            self.min_depth <= depth <= self.max_depth
+            and self.min_premise_size <= size <= self.max_premise_size
+        )
+
+
+class SearchRecord:
+    """
+    The theories found by pruned searches on one case model, for every premise
+    set and conclusion, together with the settings for which they hold.
+    """
+
+    def __init__(self):
+        self.theories: Dict[
+            Tuple[FrozenSet[Fact], Fact], List[Tuple[SearchBounds, Theory]]
+        ] = dict()
+
+    def get(
+        self,
+        premises: List[Fact],
+        conclusion: Fact,
+        depth: int,
+        max_premise_size: Optional[int],
+    ) -> Optional[Tuple[SearchBounds, Theory]]:
+        for bounds, theory in self.theories.get((frozenset(premises), conclusion), []):
+            if bounds.contain(depth, max_premise_size):
+                return bounds, theory
+        return None
+
+    def add(
+        self, premises: List[Fact], conclusion: Fact, bounds: SearchBounds, theory: Theory
+    ) -> None:
+        self.theories.setdefault((frozenset(premises), conclusion), []).append(
+            (bounds, theory)
+        )
+
+
+class TheoryPredictor:
+    """
+    A theory compiled for making many predictions, with the same results as
+    `Theory.predict`. For every statement, the arguments that conclude on it are
+    numbered, conclusive arguments first, and sets of them are stored as bitsets
+    (Python ints). Which arguments can defeat which is computed once.
+    """
+
+    def __init__(self, theory: Theory):
+        self.arguments: Dict[str, List[Argument]] = dict()
+        self.predictions: Dict[str, List[Fact]] = dict()
+        self.conclusive: Dict[str, int] = dict()
+        # For every statement and premise fact, the arguments that need the fact.
+        self.needing: Dict[str, Dict[Tuple[str, str], int]] = dict()
+        # For every statement and argument, the more specific arguments that predict otherwise.
+        self.defeaters: Dict[str, List[int]] = dict()
+        statements = unique(
+            fact.statement
+            for argument in theory.conclusive_arguments + theory.presumptively_valid_arguments
+            for fact in argument.conclusions
+        )
+        for statement in statements:
+            conclusive = [
+                a for a in theory.conclusive_arguments if concludes_on(a, statement)
+            ]
+            arguments = conclusive + [
+                a
+                for a in theory.presumptively_valid_arguments
+                if concludes_on(a, statement)
+            ]
+            predictions = [Theory.apply_argument(statement, a) for a in arguments]
+            needing: Dict[Tuple[str, str], int] = dict()
+            for i, argument in enumerate(arguments):
+                for fact in argument.premises:
+                    key = (fact.statement, fact.category)
+                    needing[key] = needing.get(key, 0) | 1 << i
+            premises = [frozenset(a.premises) for a in arguments]
+            self.arguments[statement] = arguments
+            self.predictions[statement] = predictions
+            self.conclusive[statement] = (1 << len(conclusive)) - 1
+            self.needing[statement] = needing
+            self.defeaters[statement] = [
+                sum(
+                    1 << j
+                    for j in range(len(arguments))
+                    if premises[i] <= premises[j] and predictions[j] != predictions[i]
+                )
+                for i in range(len(arguments))
+            ]
+
+    def predict(
+        self, known_facts: List[Fact], unknown_fact: str
+    ) -> Optional[Tuple[Fact, Argument]]:
+        return self._predict({(f.statement, f.category) for f in known_facts}, unknown_fact)
+
+    def predict_batch(
+        self, data_set: "pd.DataFrame", unknown_fact: str
+    ) -> Tuple[List[Optional[Fact]], List[Optional[Argument]]]:
+        """
+        Predicts the unknown fact for every row of a data set with values like
+        `category_statement`, from the values of all other columns.
+        """
+        columns = [column for column in data_set.columns if column != unknown_fact]
+        results: Dict[Tuple[str, ...], Optional[Tuple[Fact, Argument]]] = dict()
+        y_hat, arguments = [], []
+        for row in data_set[columns].itertuples(index=False, name=None):
+            if row not in results:
+                known_facts = {tuple(reversed(value.rsplit("_", 1))) for value in row}
+                results[row] = self._predict(known_facts, unknown_fact)
+            prediction = results[row]
+            y_hat.append(prediction[0] if prediction is not None else None)
+            arguments.append(prediction[1] if prediction is not None else None)
+        return y_hat, arguments
+
+    def _predict(
+        self, known_facts: AbstractSet[Tuple[str, str]], unknown_fact: str
+    ) -> Optional[Tuple[Fact, Argument]]:
+        if unknown_fact not in self.arguments:
+            return None
+        arguments = self.arguments[unknown_fact]
+        not_applicable = 0
+        for fact, needing in self.needing[unknown_fact].items():
+            if fact not in known_facts:
+                not_applicable |= needing
+        applicable = ((1 << len(arguments)) - 1) & ~not_applicable
+        if applicable & self.conclusive[unknown_fact]:
+            i = lowest_bit(applicable)
+        else:
+            defeaters = self.defeaters[unknown_fact]
+            candidates = applicable
+            while candidates and applicable & defeaters[lowest_bit(candidates)]:
+                candidates &= candidates - 1
+            if not candidates:
+                return None
+            i = lowest_bit(candidates)
+        return self.predictions[unknown_fact][i], arguments[i]
+
+
+def concludes_on(argument: Argument, statement: str) -> bool:
+    return any(fact.statement == statement for fact in argument.conclusions)
+
+
+def lowest_bit(bits: int) -> int:
+    return (bits & -bits).bit_length() - 1
+
+
+# The case model is sent to each worker process once, when the pool starts,
+# rather than with every conclusion that is searched.
+_worker_case_model: Optional[CaseModel] = None
+
+
+def _set_worker_case_model(case_model: CaseModel) -> None:
+    global _worker_case_model
+    _worker_case_model = case_model
+
+
+def _init_pruned_search_in_worker(
+    conclusion: Fact, depth: int, max_premise_size: Optional[int], log: bool
+) -> Theory:
+    assert _worker_case_model is not None
+    return Theory.init_pruned_search(
+        conclusion, _worker_case_model, depth, max_premise_size, log
+    )
+
+
+def _init_pruned_search_sweep_in_worker(
+    conclusion: Fact, settings: List[Tuple[int, Optional[int]]], log: bool
+) -> List[Theory]:
+    assert _worker_case_model is not None
+    return Theory.init_pruned_search_sweep(
+        conclusion, _worker_case_model, settings, log
+    )
@@ -4,19 +4,7 @@ import itertools as it
 from helpers import *
 
 
-def premise_candidates(columns: Dict[str, List[str]]) -> List[List[Fact]]:
-    premise_candidates = list(
-        it.product(
-            *[
-                [*[[Fact(name, category)] for category in columns], []]
-                for name, categories in columns.items()
-            ]
-        )
-    )
-    return [list(it.chain(*a)) for a in premise_candidates]
-
-
-def fact_candidates(columns: Dict[str, List[str]]) -> List[Fact]:
+def fact_candidates(columns: Dict[str, Sequence[str]]) -> List[Fact]:
     return list(
         it.chain(
             *[
@@ -27,33 +15,127 @@ def fact_candidates(columns: Dict[str, List[str]]) -> List[Fact]:
     )
 
 
-def candidate_arguments(columns: Dict[str, List[str]]) -> List[Argument]:
-    return [
-        Argument(ps, [c])
-        for c, ps in it.product(fact_candidates(columns), premise_candidates(columns))
-        if c not in ps and all([other not in ps for other in c.other_categories])
+def coherent_premises(case_model: CaseModel) -> Iterator[List[Fact]]:
+    """
+    Yields every set of premises that some case contains, in order of size and
+    starting with the empty set. The facts of a set are about different statements,
+    in the order of `namesAndCategories`. Sets that no case contains are not
+    extended, as none of their supersets is contained in a case either.
+    """
+    order = {statement: i for i, statement in enumerate(case_model.schema.categories)}
+    facts = [
+        (fact, case_model.index.covering([fact])) for fact in case_model.schema.facts
     ]
+    level = [([], case_model.index.all_cases)]
+    while level:
+        next_level = []
+        for premises, cases in level:
+            yield premises
+            last = order[premises[-1].statement] if premises else -1
+            for fact, fact_cases in facts:
+                if order[fact.statement] > last and cases & fact_cases:
+                    next_level.append(([*premises, fact], cases & fact_cases))
+        level = next_level
+
+
+def candidate_arguments(case_model: CaseModel) -> Iterator[Argument]:
+    """
+    Yields the coherent arguments from premises to a single conclusion about
+    another statement, in order of the number of premises.
+    """
+    index = case_model.index
+    conclusions = [(fact, index.covering([fact])) for fact in case_model.schema.facts]
+    for premises in coherent_premises(case_model):
+        cases = case_model.premise_cache.covering(premises)
+        statements = {premise.statement for premise in premises}
+        for conclusion, conclusion_cases in conclusions:
+            if conclusion.statement not in statements and cases & conclusion_cases:
+                yield Argument(premises, [conclusion])
+
+
+class RelevanceFilter:
+    """
+    `filter_arguments` for a stream of arguments of different kinds (conclusive,
+    presumptively valid or coherent), with a single conclusion, that arrive in
+    order of the number of their premises. An argument is only compared with
+    the arguments of its own kind.
+
+    Whether an argument is relevant only depends on the arguments with fewer
+    premises, which have all been added before. For each argument, the kinds of
+    the arguments with fewer premises and the same conclusion, or another
+    category of it, are kept. They follow from those of the arguments with one
+    premise less, so only these are looked up.
+    """
+
+    def __init__(self):
+        # (conclusion, premises) -> kind, and the bitsets of kinds with the
+        # same conclusion and with another category from fewer premises
+        self.arguments: Dict[
+            Tuple[Fact, FrozenSet[Fact]], Tuple[int, int, int]
+        ] = dict()
+
+    def add(self, argument: Argument, kind: int) -> bool:
+        """Adds the coherent argument, and returns whether it is relevant."""
+        [conclusion] = argument.conclusions
+        premises = frozenset(argument.premises)
+        same, other = 0, 0
+        for premise in premises:
+            subset = premises - {premise}
+            # this argument is coherent, so the one from fewer premises is too
+            subset_kind, subset_same, subset_other = self.arguments[
+                (conclusion, subset)
+            ]
+            same |= 1 << subset_kind | subset_same
+            other |= subset_other
+            for category in conclusion.other_categories:
+                entry = self.arguments.get((category, subset))
+                if category is not conclusion and entry is not None:
+                    other |= 1 << entry[0]
+        self.arguments[(conclusion, premises)] = (kind, same, other)
+        # not overly specific, or an exception
+        return not (same >> kind & 1) or bool(other >> kind & 1)
 
 
 def filter_arguments(arguments: List[Argument]) -> List[Argument]:
     return [a for a in arguments if a.is_relevant(arguments)]
 
 
-def join_arguments(arguments: List[Argument]) -> List[Argument]:
-    grouped_by_premises: Dict[FrozenSet[Fact], List[Fact]] = dict()
-    for argument in arguments:
-        key = frozenset(argument.premises)
-        if key in grouped_by_premises:
-            grouped_by_premises[key] += argument.conclusions
-        else:
-            grouped_by_premises[key] = argument.conclusions
-    return sorted(
-        [
-            Argument(list(premises), list(set(conclusions)))
-            for premises, conclusions in grouped_by_premises.items()
-        ],
-        key=str,
-    )
+class ArgumentSet:
+    """
+    Arguments collected without duplicates, under the key of their premises and
+    conclusions. Adding arguments does not sort them; they are sorted once, when
+    they are read with `sorted` or `joined`.
+    """
+
+    def __init__(self, arguments: Iterable[Argument] = ()):
+        self.arguments: Dict[Tuple[FrozenSet[Fact], FrozenSet[Fact]], Argument] = dict()
+        self.extend(arguments)
+
+    def extend(self, arguments: Iterable[Argument]):
+        for argument in arguments:
+            self.arguments.setdefault(argument.key, argument)
+
+    def sorted(self) -> List[Argument]:
+        return sorted(self.arguments.values(), key=str)
+
+    def joined(self) -> List[Argument]:
+        """The arguments with the same premises joined into one, sorted."""
+        grouped_by_premises: Dict[FrozenSet[Fact], Dict[Fact, None]] = dict()
+        for premises, conclusions in self.arguments:
+            grouped_by_premises.setdefault(premises, dict()).update(
+                dict.fromkeys(conclusions)
+            )
+        return sorted(
+            [
+                Argument(list(premises), list(conclusions))
+                for premises, conclusions in grouped_by_premises.items()
+            ],
+            key=str,
+        )
+
+
+def join_arguments(arguments: Iterable[Argument]) -> List[Argument]:
+    return ArgumentSet(arguments).joined()
 
 
 def postprocess(arguments: List[Argument]) -> List[Argument]:
@@ -77,11 +159,13 @@ def is_consistent(facts: List[Fact]) -> bool:
 def premise_candidates_(
     conclusion: Fact, premises: List[Fact], case_model: CaseModel
 ) -> List[List[Fact]]:
+    schema = case_model.schema
+    statements = {conclusion.statement, *[premise.statement for premise in premises]}
     return [
         unique([fact, *premises])
-        for fact in fact_candidates(case_model.namesAndCategories)
-        if fact.statement != conclusion.statement
-        and fact.statement not in {p.statement for p in premises}
+        for statement in schema.categories
+        if statement not in statements
+        for fact in schema.facts_about(statement)
     ]
 
 
@@ -90,12 +174,37 @@ def more_specific_sets(subsets: List[List[Fact]]) -> List[List[Fact]]:
     If a set contains a quality criterion (for example, conclusiveness), all its subsets must also fulfill it.
     Therefore, this function takes some sets of size n each
     -- like {{A, B, C, D}, {B, C, D, E}, {C, D, E, F}
-    and returns all sets of size n+1 whose subsets are in the input set.
+    and returns all sets of size n+1 of which at least two subsets are in the input set.
     -- like {{A, B, C, D, E}, {B, C, D, E, F}}
     These are all the sets of size n+1 that potentially fulfill the quality criterion.
+
+    Sets that only have one of their subsets in the input set can be ruled out with
+    `has_subset_in`, once it is known which of their subsets do not fulfill the criterion.
+
+    Two sets are joined when they share n-1 facts. To find them, every set is
+    indexed under each subset that is left when dropping one of its facts.
+    Every set of size n+1 is returned once, with its facts in sorted order.
     """
-    return [
-        unique(a+b)
-        for (a, b) in list(it.combinations(subsets, 2))
-        if len(symmetric_difference(a, b)) == 2
-    ]
+    dropped_facts_by_rest: Dict[FrozenSet[Fact], Dict[Fact, None]] = dict()
+    for subset in subsets:
+        facts = frozenset(subset)
+        for fact in facts:
+            dropped_facts_by_rest.setdefault(facts - {fact}, dict())[fact] = None
+    visited: Set[FrozenSet[Fact]] = set()
+    result = []
+    for rest, dropped_facts in dropped_facts_by_rest.items():
+        for a, b in it.combinations(dropped_facts, 2):
+            candidate = rest | {a, b}
+            if candidate not in visited:
+                visited.add(candidate)
+                result.append(unique(candidate))
+    return result
+
+
+def has_subset_in(subset: List[Fact], smaller_sets: AbstractSet[FrozenSet[Fact]]) -> bool:
+    """
+    Whether one of the sets that are left when dropping a single fact from the subset
+    is among the smaller sets.
+    """
+    facts = frozenset(subset)
+    return any(facts - {fact} in smaller_sets for fact in facts)
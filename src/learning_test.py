@@ -0,0 +1,121 @@
+import learning
+from learning import Theory, TheoryBuilder, TheoryPredictor
+from learning_helpers import more_specific_sets, fact_candidates, postprocess
+from logic import Argument, CaseModel, Fact
+import itertools as it
+
+
+def test_parallel_pruned_search(boston_case_model):
+    case_model = boston_case_model()
+    serial = Theory.learn_with_pruned_search(case_model, depth=3, max_premise_size=2)
+    parallel = Theory.learn_with_pruned_search(
+        case_model, depth=3, max_premise_size=2, n_jobs=2
+    )
+    assert serial == parallel
+    assert serial.size > 0
+
+
+def test_pruned_search_skips_supersets_of_incoherent_premises(monkeypatch):
+    # a ∧ b is not coherent with d, but a ∧ c and b ∧ c are, without being
+    # conclusive, so a ∧ b ∧ c is a candidate that extends an incoherent premise
+    case_model = CaseModel.fromStr(
+        [(0.4, "a, ¬b, c, d"), (0.3, "¬a, b, c, d"), (0.2, "a, b, c, ¬d"), (0.1, "¬a, ¬b, ¬c, ¬d")]
+    )
+    a, b, c, d = [Fact.fromStr(statement) for statement in "abcd"]
+    assert not Argument([a, b], [d]).is_coherent_in(case_model)
+
+    def search():
+        evaluated = set()
+        is_conclusive_in = Argument.is_conclusive_in
+
+        def spy(argument, case_model):
+            evaluated.add(frozenset(argument.premises))
+            return is_conclusive_in(argument, case_model)
+
+        with monkeypatch.context() as patch:
+            patch.setattr(Argument, "is_conclusive_in", spy)
+            theory = Theory.pruned_search([], d, case_model, Theory([], [], []), 1, None)
+        return theory, evaluated
+
+    pruned, evaluated = search()
+    assert frozenset([a, c]) in evaluated and frozenset([a, b, c]) not in evaluated
+    with monkeypatch.context() as patch:
+        patch.setattr(learning, "has_subset_in", lambda subset, smaller_sets: False)
+        unpruned, evaluated = search()
+    assert frozenset([a, b, c]) in evaluated
+    assert pruned == unpruned
+
+
+def test_more_specific_sets_are_unique():
+    a, b, c, d = [Fact(statement) for statement in "abcd"]
+    subsets = [[a, b], [b, c], [a, c], [c, d], [b, d]]
+    joined = more_specific_sets(subsets)
+    assert set(map(frozenset, joined)) == set(
+        map(frozenset, [[a, b, c], [a, b, d], [a, c, d], [b, c, d]])
+    )
+    assert len(joined) == len(set(map(frozenset, joined)))
+
+
+def test_compiled_predictions(boston_data, boston_case_model):
+    binned_data, categories = boston_data()
+    theory = Theory.learn_with_pruned_search(
+        boston_case_model(), depth=3, max_premise_size=3
+    )
+    unknown_fact = binned_data.columns[-1]
+    y_hat, arguments = TheoryPredictor(theory).predict_batch(binned_data, unknown_fact)
+    for i, (_, row) in enumerate(binned_data.drop(columns=unknown_fact).iterrows()):
+        known_facts = [
+            Fact.fromStr(value, categories[statement])
+            for statement, value in row.items()
+        ]
+        prediction = theory.predict(known_facts, unknown_fact)
+        assert (y_hat[i], arguments[i]) == (prediction or (None, None))
+
+
+def test_pruned_search_sweep(boston_case_model):
+    case_model = boston_case_model()
+    settings = [(5, 3), (1, 2), (2, 2), (3, None), (20, 1)]
+    theories = Theory.learn_with_pruned_search_sweep(case_model, settings)
+    parallel = Theory.learn_with_pruned_search_sweep(case_model, settings, n_jobs=2)
+    for depth, max_premise_size in settings:
+        separate = Theory.learn_with_pruned_search(case_model, depth, max_premise_size)
+        assert theories[depth, max_premise_size] == separate
+        assert parallel[depth, max_premise_size] == separate
+
+
+def test_naive_search(boston_case_model):
+    for case_model in [
+        CaseModel.fromStr([(1, "pun, gui, evi"), (0, "¬pun, gui, evi, jus"), (0, "¬gui, evi, ali")]),
+        boston_case_model(columns=slice(11, 14), n_bins=3),
+    ]:
+        # every argument from any premises, classified and filtered as a whole
+        columns = case_model.namesAndCategories
+        expected = Theory([], [], [])
+        for premises in it.product(*[[[], *[[fact] for fact in fact_candidates({s: c})]] for s, c in columns.items()]):
+            premises = list(it.chain(*premises))
+            for conclusion in fact_candidates(columns):
+                if conclusion.statement in [premise.statement for premise in premises]:
+                    continue
+                argument = Argument(premises, [conclusion])
+                if argument.is_conclusive_in(case_model):
+                    expected.conclusive_arguments.append(argument)
+                elif argument.is_presumptively_valid_in(case_model):
+                    expected.presumptively_valid_arguments.append(argument)
+                elif argument.is_coherent_in(case_model):
+                    expected.coherent_arguments.append(argument)
+        theory = Theory.learn_with_naive_search(case_model)
+        assert str(theory.conclusive_arguments) == str(postprocess(expected.conclusive_arguments))
+        assert str(theory.presumptively_valid_arguments) == str(postprocess(expected.presumptively_valid_arguments))
+        assert str(theory.coherent_arguments) == str(postprocess(expected.coherent_arguments))
+    # premises of several facts are found, which a bug in the candidate premises used to prevent
+    assert any(len(argument.premises) > 1 for argument in theory.presumptively_valid_arguments)
+
+
+def test_theory_builder():
+    a, b, c = Argument.fromStr("a <- b"), Argument.fromStr("a <- c, b"), Argument.fromStr("c <- b")
+    first = Theory([b, a], [], [])
+    second = Theory([Argument.fromStr("a <- b, c"), c], [a], [])
+    union = Theory.union(first, second)
+    assert union.conclusive_arguments == [a, b, c]
+    assert union.presumptively_valid_arguments == [a]
+    assert str(TheoryBuilder().add(first, second).build_joined().conclusive_arguments) == "[a <- b ∧ c, a ∧ c <- b]"
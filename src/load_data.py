@@ -3,7 +3,6 @@ import pandas as pd
 import numpy as np
 from logic import Case, Fact, CaseModel
 from typing import *
-from helpers import histogram
 import itertools as it
 
 cwd = os.getcwd()
@@ -51,20 +50,54 @@ def bin_data_set(
 
 
 def generate_case_model(
-    binned_data: pd.DataFrame, categories: Dict[str, List[str]]
+    binned_data: pd.DataFrame, categories: Dict[str, Sequence[str]]
 ) -> CaseModel:
-    cases: Dict[Tuple[Any, ...], float] = dict()
-    data_points = [tuple(binned_data.loc[i]) for i in binned_data.index]
+    return generate_case_model_from_chunks([binned_data], categories)
 
+
+def stream_case_model(
+    data_set_name: str, categories: Dict[str, Sequence[str]], chunksize: int = 100_000
+) -> CaseModel:
+    """
+    Generates the case model from a csv file of binned data that is read in chunks,
+    so that the whole file never has to fit in memory.
+    """
+    chunks = pd.read_csv(
+        os.path.join(cwd, *["data", data_set_name]), chunksize=chunksize, dtype="category"
+    )
+    return generate_case_model_from_chunks(chunks, categories)
+
+
+def generate_case_model_from_chunks(
+    chunks: Iterable[pd.DataFrame], categories: Dict[str, Sequence[str]]
+) -> CaseModel:
+    """
+    Generates the case model from binned data that comes in parts, by counting the
+    distinct rows of each part. Only the cases and their counts are kept in memory.
+    """
+    counts: Dict[Tuple[str, ...], int] = dict()
+    n_rows = 0
+    for chunk in chunks:
+        # grouping would leave out rows with missing values, and so change the probabilities
+        if chunk.isna().values.any():
+            raise ValueError("The binned data has missing values")
+        chunk_counts = chunk.groupby(list(chunk.columns), sort=False, observed=True).size()
+        for facts, count in chunk_counts.items():
+            facts = facts if isinstance(facts, tuple) else (facts,)
+            counts[facts] = counts.get(facts, 0) + int(count)
+        n_rows += int(chunk_counts.sum())
+
+    facts_by_value: Dict[str, Fact] = dict()
+    for facts in counts:
+        for fact in facts:
+            if fact not in facts_by_value:
+                facts_by_value[fact] = Fact.fromStr(fact, categories[fact.rsplit("_", 1)[1]])
     return CaseModel(
         [
             Case(
-                probability=count / len(binned_data),
-                facts=[
-                    Fact.fromStr(fact, categories[fact.rsplit("_", 1)[1]])
-                    for fact in facts
-                ],
+                probability=count / n_rows,
+                facts=[facts_by_value[fact] for fact in facts],
             )
-            for facts, count in histogram(data_points).items()
+            for facts, count in counts.items()
         ]
     )
@@ -0,0 +1,31 @@
+import os
+import pandas as pd
+import pytest
+from load_data import (
+    generate_case_model,
+    generate_case_model_from_chunks,
+    stream_case_model,
+)
+import load_data
+
+
+def test_streamed_case_model(tmp_path, monkeypatch, boston_data):
+    binned_data, categories = boston_data()
+    case_model = generate_case_model(binned_data, categories)
+    assert abs(sum(case.probability for case in case_model.cases) - 1) < 1e-9
+
+    chunks = (binned_data.iloc[i : i + 50] for i in range(0, len(binned_data), 50))
+    assert str(generate_case_model_from_chunks(chunks, categories)) == str(case_model)
+
+    os.mkdir(tmp_path / "data")
+    binned_data.to_csv(tmp_path / "data" / "binned.csv", index=False)
+    monkeypatch.setattr(load_data, "cwd", str(tmp_path))
+    streamed = stream_case_model("binned.csv", categories, chunksize=64)
+    assert str(streamed) == str(case_model)
+
+
+def test_case_model_from_rows_with_missing_values():
+    binned_data = pd.DataFrame({"x": ["low_x", None, "high_x"], "y": ["low_y", "low_y", "high_y"]})
+    categories = {"x": ["low", "high"], "y": ["low", "high"]}
+    with pytest.raises(ValueError):
+        generate_case_model(binned_data, categories)
@@ -1,18 +1,61 @@
+import os
+import weakref
+from types import MappingProxyType
 from typing import *
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from itertools import combinations
-from multiprocessing import Pool
 from re import split
 from functools import cached_property
-from helpers import subset, proper_subset, implies
+from collections import OrderedDict
+from helpers import subset, proper_subset
 import itertools as it
 
 
 class Fact:
-    def __init__(self, statement: str, category: str = "true", categories: List[str] = ["true", "false"]):
-        self.statement = statement
-        self.category = category
-        self.categories = categories
+    """
+    A statement together with the category it takes, e.g. `Fact("rain")` or
+    `Fact("medv", "low", ["low", "medium", "high"])`.
+
+    Facts are interned: constructing the same fact twice returns the same
+    object, so that equality is identity and the hash is computed only once.
+    The table only holds facts weakly, so that the facts of case models that
+    are no longer used, for example earlier data sets of an experiment, are
+    freed.
+    """
+
+    __slots__ = (
+        "statement",
+        "category",
+        "categories",
+        "_hash",
+        "_other_categories",
+        "__weakref__",
+    )
+    _interned: "weakref.WeakValueDictionary[Tuple[str, str, FrozenSet[str]], Fact]" = (
+        weakref.WeakValueDictionary()
+    )
+
+    def __new__(
+        cls,
+        statement: str,
+        category: str = "true",
+        categories: Sequence[str] = ("true", "false"),
+    ) -> "Fact":
+        key = (statement, category, frozenset(categories))
+        fact = cls._interned.get(key)
+        if fact is None:
+            fact = super().__new__(cls)
+            fact.statement = statement
+            fact.category = category
+            fact.categories = tuple(categories)
+            fact._hash = hash(key)
+            fact._other_categories = None
+            cls._interned[key] = fact
+        return fact
+
+    def __reduce__(self):
+        # unpickling goes through `__new__`, so that facts stay interned
+        return Fact, (self.statement, self.category, self.categories)
 
     def __repr__(self) -> str:
         return (
@@ -22,20 +65,22 @@ class Fact:
         ) + self.statement
 
     def __hash__(self):
-        return sum([hash(self.statement), hash(self.category), *[hash(c) for c in self.categories]])
+        return self._hash
 
     def __eq__(self, other):
-        return hash(self) == hash(other)
+        return self is other
 
     @property
-    def other_categories(self) -> List["Fact"]:
-        return [
-            Fact(self.statement, category, self.categories)
-            for category in self.categories
-        ]
+    def other_categories(self) -> Tuple["Fact", ...]:
+        if self._other_categories is None:
+            self._other_categories = tuple(
+                Fact(self.statement, category, self.categories)
+                for category in self.categories
+            )
+        return self._other_categories
 
     @staticmethod
-    def fromStr(str: str, categories: List[str] = ["true", "false"]) -> "Fact":
+    def fromStr(str: str, categories: Sequence[str] = ("true", "false")) -> "Fact":
         if "_" in str:
             prefix, rest = str.rsplit("_", maxsplit=1)
             assert prefix in categories
@@ -52,6 +97,11 @@ class Argument:
     premises: List[Fact]
     conclusions: List[Fact]
 
+    @cached_property
+    def key(self) -> Tuple[FrozenSet[Fact], FrozenSet[Fact]]:
+        """The premises and conclusions, regardless of their order."""
+        return frozenset(self.premises), frozenset(self.conclusions)
+
     def toStr(self, arrow: str = "<-") -> str:
         return "{0} {1} {2}".format(
             " ∧ ".join([str(fact) for fact in sorted(self.conclusions, key=str)]),
@@ -99,24 +149,23 @@ class Argument:
         return self.premises == []
 
     def is_coherent_in(self, case_model: "CaseModel") -> bool:
-        return any([subset(self.positions, case.facts) for case in case_model.cases])
+        premise_cases = case_model.premise_cache.covering(self.premises)
+        return (premise_cases & case_model.index.covering(self.conclusions)) != 0
 
     def is_conclusive_in(self, case_model: "CaseModel") -> bool:
-        return self.is_coherent_in(case_model) and all(
-            [
-                implies(
-                    subset(self.premises, case.facts),
-                    subset(self.conclusions, case.facts),
-                )
-                for case in case_model.cases
-            ]
-        )
+        # Every case that contains the premises also contains the conclusions,
+        # and there is at least one such case.
+        premise_cases = case_model.premise_cache.covering(self.premises)
+        conclusion_cases = case_model.index.covering(self.conclusions)
+        return (premise_cases & conclusion_cases) != 0 and (
+            premise_cases & ~conclusion_cases
+        ) == 0
 
     def is_presumptively_valid_in(self, case_model: "CaseModel") -> bool:
-        most_preferred_cases = case_model.most_preferred_cases(self.premises)
-        return len(most_preferred_cases) > 0 and all(
-            [subset(self.conclusions, case.facts) for case in most_preferred_cases]
-        )
+        most_preferred_cases = case_model.premise_cache.most_preferred(self.premises)
+        return most_preferred_cases != 0 and (
+            most_preferred_cases & ~case_model.index.covering(self.conclusions)
+        ) == 0
 
     def is_properly_defeasible_in(self, case_model: "CaseModel") -> bool:
         return self.is_presumptively_valid_in(case_model) and not self.is_conclusive_in(
@@ -221,29 +270,211 @@ class Case:
         return Case(self.probability + other.probability, self.facts + other.facts)
 
 
-def check_cases(cases_list, complete_case_list):
-    for case1, case2 in cases_list:
-        # Definition 1, page 131
-        # ToDo: Implement condition 5
-        assert all(
-            [
-                frozenset([fact])
-                not in [frozenset(case.facts) for case in complete_case_list]
-                for fact in case1.facts
-            ]
-        ), "Case Model not valid, condition 1 was violated"
-        if not case1 == case2:
-            assert (
-                not case1 + case2 in complete_case_list
-            ), "Case Model not valid, condition 2 was violated"
-        if case1 == case2:
-            assert case1 == case2, "Case Model not valid, condition 3 was violated"
-            # This is trivial
-        if not (
-            case1.probability >= case2.probability
-            or case1.probability <= case2.probability
+class CaseIndex:
+    """
+    Bitset index over the cases of a case model.
+
+    Every fact is interned to an integer id and every case is stored as a bitset
+    over fact ids. The inverted index maps each fact id to the bitset of the
+    cases containing it, so that the cases covering a list of facts are the
+    bitwise AND of their entries. Case bits are assigned in order of decreasing
+    probability, hence the lowest set bit always belongs to a most preferred case.
+    """
+
+    def __init__(self, cases: List["Case"]):
+        # stable sort: cases of equal probability keep their original order
+        self.order = sorted(
+            range(len(cases)), key=lambda i: cases[i].probability, reverse=True
+        )
+        self.cases = [cases[i] for i in self.order]
+        self.all_cases = (1 << len(cases)) - 1
+        self.fact_ids: Dict[Fact, int] = dict()
+        self.cases_with: List[int] = []  # fact id -> bitset of cases
+        self.case_facts: List[int] = []  # case bit -> bitset of fact ids
+        for bit, case in enumerate(self.cases):
+            facts = 0
+            for fact in case.facts:
+                fact_id = self.fact_ids.setdefault(fact, len(self.fact_ids))
+                if fact_id == len(self.cases_with):
+                    self.cases_with.append(0)
+                self.cases_with[fact_id] |= 1 << bit
+                facts |= 1 << fact_id
+            self.case_facts.append(facts)
+        # case bit -> bitset of all cases with the same probability
+        self.equally_preferred: List[int] = []
+        for _, group in it.groupby(
+            range(len(self.cases)), key=lambda bit: self.cases[bit].probability
         ):
-            assert False, "Case Model not valid, condition 4 was violated"
+            bits = list(group)
+            level = sum(1 << bit for bit in bits)
+            self.equally_preferred += [level] * len(bits)
+
+    def covering(self, facts: Iterable[Fact]) -> int:
+        """Bitset of the cases that contain all the given facts."""
+        cases = self.all_cases
+        for fact in facts:
+            fact_id = self.fact_ids.get(fact)
+            if fact_id is None:
+                return 0
+            cases &= self.cases_with[fact_id]
+            if cases == 0:
+                return 0
+        return cases
+
+    def most_preferred(self, cases: int) -> int:
+        """Bitset of the most preferred cases among the given ones."""
+        if cases == 0:
+            return 0
+        best = (cases & -cases).bit_length() - 1
+        if self.cases[best].probability < 0.0:
+            return 0
+        return cases & self.equally_preferred[best]
+
+    def members(self, cases: int) -> List["Case"]:
+        """The cases of a bitset, in the order of the case model."""
+        bits = []
+        while cases:
+            lowest = cases & -cases
+            bits.append(lowest.bit_length() - 1)
+            cases ^= lowest
+        return [self.cases[bit] for bit in sorted(bits, key=self.order.__getitem__)]
+
+
+class PremiseCache:
+    """
+    Bounded LRU cache, keyed on sets of premises, of the cases covering the premises
+    and the most preferred ones among them. During learning, the same premises are
+    queried for every conclusion and by every argument predicate.
+    """
+
+    def __init__(self, index: CaseIndex, maxsize: Optional[int] = 2**16):
+        self.index = index
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[FrozenSet[Fact], Tuple[int, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, premises: Iterable[Fact]) -> Tuple[int, int]:
+        """The covering and the most preferred cases of the premises."""
+        key = frozenset(premises)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        cases = self.index.covering(key)
+        entry = (cases, self.index.most_preferred(cases))
+        self.entries[key] = entry
+        if self.maxsize is not None and len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return entry
+
+    def covering(self, premises: Iterable[Fact]) -> int:
+        return self.lookup(premises)[0]
+
+    def most_preferred(self, premises: Iterable[Fact]) -> int:
+        return self.lookup(premises)[1]
+
+    def max_probability(self, premises: Iterable[Fact]) -> float:
+        """Probability of the most preferred cases, or 0 if no case covers the premises."""
+        cases = self.covering(premises)
+        if cases == 0:
+            return 0.0
+        return self.index.cases[(cases & -cases).bit_length() - 1].probability
+
+
+@dataclass(frozen=True)
+class Schema:
+    """
+    The statements of a case model with their categories, every fact about them
+    in the order of the statements and their categories, and for each statement
+    the ids of its facts, which are their positions in `facts`.
+    """
+
+    categories: Dict[str, Tuple[str, ...]]
+    facts: Tuple[Fact, ...]
+    fact_ids: Dict[str, Tuple[int, ...]]
+
+    @staticmethod
+    def of(cases: List[Case]) -> "Schema":
+        categories = dict(
+            it.chain(
+                *[
+                    [(fact.statement, fact.categories) for fact in case.facts]
+                    for case in cases
+                ]
+            )
+        )
+        facts: List[Fact] = []
+        fact_ids: Dict[str, Tuple[int, ...]] = dict()
+        for statement, statement_categories in categories.items():
+            fact_ids[statement] = tuple(
+                range(len(facts), len(facts) + len(statement_categories))
+            )
+            facts += [
+                Fact(statement, category, statement_categories)
+                for category in statement_categories
+            ]
+        return Schema(categories, tuple(facts), fact_ids)
+
+    def facts_about(self, statement: str) -> List[Fact]:
+        return [self.facts[fact_id] for fact_id in self.fact_ids[statement]]
+
+
+def first_violation(
+    case_model: "CaseModel", positions: Iterable[int]
+) -> Optional[Tuple[int, int, int]]:
+    """
+    The first violation of condition 1, 2 or 3 of Definition 1 (page 131) by one
+    of the cases at the given positions, as the condition and the positions of
+    the violating pair of cases.
+
+    1. No fact of a case is a different case. A case may consist of a single
+       fact, as long as no other case contains that fact. (The pairwise check
+       this replaces accepted such a case too, though only as the last case.)
+    2. No case contains all facts of a different case, so that the cases
+       exclude each other.
+    3. Cases with the same facts are the same case, so no case occurs twice.
+    """
+    index = case_model.index
+    bits = {position: bit for bit, position in enumerate(index.order)}
+    single_fact_cases: Dict[Fact, int] = dict()
+    for position, case in enumerate(case_model.cases):
+        if len(set(case.facts)) == 1:
+            single_fact_cases.setdefault(case.facts[0], position)
+
+    for i in positions:
+        case = case_model.cases[i]
+        for fact in case.facts:
+            j = single_fact_cases.get(fact, i)
+            if j != i:
+                return 1, i, j
+        # the other cases that contain all facts of this case
+        containing = index.covering(case.facts) & ~(1 << bits[i])
+        if containing:
+            j = min(
+                index.order[bit]
+                for bit in range(containing.bit_length())
+                if containing >> bit & 1
+            )
+            return (3 if case == case_model.cases[j] else 2), i, j
+    return None
+
+
+# The case model is sent to each worker process once, when the pool starts,
+# rather than with every chunk of cases that is validated.
+_validated_case_model: Optional["CaseModel"] = None
+
+
+def _set_validated_case_model(case_model: "CaseModel") -> None:
+    global _validated_case_model
+    _validated_case_model = case_model
+
+
+def _first_violation_in_worker(positions: range) -> Optional[Tuple[int, int, int]]:
+    assert _validated_case_model is not None
+    return first_violation(_validated_case_model, positions)
 
 
 @dataclass
@@ -258,49 +489,93 @@ class CaseModel:
         return CaseModel([Case.fromStr(case[0], case[1]) for case in cases])
 
     @cached_property
-    def valid(self, no_processes: int = 5):
-        case_combinations = list(set(combinations(self.cases, 2)))
-        case_combinations_splitted = [
-            case_combinations[i::no_processes] for i in range(no_processes)
-        ]
-        args = [(case_list, self.cases) for case_list in case_combinations_splitted]
-        with Pool(5) as p:
-            p.starmap(check_cases, args)
+    def valid(self) -> bool:
+        return self.validate()
+
+    def validate(self, n_jobs: Optional[int] = None) -> bool:
+        """
+        Checks the conditions of Definition 1 (page 131), and raises an
+        AssertionError naming the first pair of cases that violates one. The
+        cases are checked in chunks that can run in parallel (`n_jobs=-1` uses
+        all cores).
+
+        Condition 5, that the order of the cases is transitive, holds by
+        construction: the cases are ordered by their probabilities, which are
+        numbers. Condition 4, that any two cases are comparable, fails for a
+        probability that is not a number.
+        """
+        positions = range(len(self.cases))
+        if n_jobs is None or n_jobs == 1:
+            violations = [first_violation(self, positions)]
+        else:
+            workers = os.cpu_count() if n_jobs < 0 else n_jobs
+            size = -(-len(positions) // (4 * workers)) or 1
+            chunks = [positions[i : i + size] for i in range(0, len(positions), size)]
+            self.index  # indexed once, before the case model is sent to the workers
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_set_validated_case_model,
+                initargs=(self,),
+            ) as executor:
+                violations = list(executor.map(_first_violation_in_worker, chunks))
+        for violation in violations:
+            if violation is not None:
+                condition, i, j = violation
+                raise AssertionError(
+                    "Case Model not valid, condition %d was violated by %s and %s"
+                    % (condition, self.cases[i], self.cases[j])
+                )
+
+        # 4. any two cases are comparable; a probability that is not a number is
+        # not comparable with the probability before or after it in the order
+        cases = self.index.cases
+        for case, next_case in zip(cases, cases[1:] + cases[-1:]):
+            if not (
+                case.probability >= next_case.probability
+                or case.probability <= next_case.probability
+            ):
+                raise AssertionError(
+                    "Case Model not valid, condition 4 was violated by %s and %s"
+                    % (case, next_case)
+                )
         return True
 
+    @cached_property
+    def index(self) -> CaseIndex:
+        return CaseIndex(self.cases)
+
+    @cached_property
+    def premise_cache(self) -> PremiseCache:
+        return PremiseCache(self.index)
+
     def probability(self, fact: Fact) -> float:
         probability = 0.0
-        for case in self.cases:
-            if fact in case.facts:
-                probability += case.probability
+        for case in self.index.members(self.index.covering([fact])):
+            probability += case.probability
         return probability
 
     def conditional_probability(self, fact: Fact, given_fact: Fact) -> float:
         probability = 0.0
-        for case in self.cases:
-            if fact in case.facts and given_fact in case.facts:
-                probability += case.probability
+        for case in self.index.members(self.index.covering([fact, given_fact])):
+            probability += case.probability
         return probability / self.probability(given_fact)
 
     def most_preferred_cases(self, facts: List[Fact]) -> List[Case]:
-        most_preferred_cases = []
-        max_probability = 0.0
-        for case in self.cases:
-            if subset(facts, case.facts):
-                if case.probability > max_probability:
-                    max_probability = case.probability
-                    most_preferred_cases = [case]
-                elif case.probability == max_probability:
-                    most_preferred_cases.append(case)
-        return most_preferred_cases
+        return self.index.members(self.premise_cache.most_preferred(facts))
+
+    @cached_property
+    def schema(self) -> Schema:
+        return Schema.of(self.cases)
 
     @property
-    def namesAndCategories(self) -> Dict[str, List[str]]:
-        return dict(
-            it.chain(
-                *[
-                    [(fact.statement, fact.categories) for fact in case.facts]
-                    for case in self.cases
-                ]
-            )
-        )
+    def namesAndCategories(self) -> Mapping[str, Tuple[str, ...]]:
+        return MappingProxyType(self.schema.categories)
+
+    def add_cases(self, cases: List[Case]):
+        self.cases += cases
+        self.invalidate()
+
+    def invalidate(self):
+        """Forgets everything computed from the cases, after they have changed."""
+        for name in ["valid", "index", "premise_cache", "schema"]:
+            self.__dict__.pop(name, None)
@@ -1,5 +1,7 @@
 from logic import *
+import gc
 import itertools as itertools
+import pickle
 
 
 def test_1():
@@ -281,3 +283,123 @@ def test_simonshaven_full() -> None:
     argument_3 = Argument(premises=EVIDENCE[16:22], conclusions=[Fact("perry")])
     # No cases imply the extended premises and the conclusion
     assert not argument_3.is_coherent_in(full_case_model)
+
+
+def test_case_index_matches_list_semantics() -> None:
+    case_model = CaseModel.fromStr(
+        [
+            (0.25, "a, b, ¬c"),
+            (0.25, "a, ¬b, c"),
+            (0.5, "¬a, b"),
+            (0, "¬a, ¬b, c"),
+            (0, "¬a, ¬b, ¬c, d"),
+        ]
+    )
+    facts = list(
+        itertools.chain(*[[Fact(s), Fact(s, "false")] for s in ["a", "b", "c", "d"]])
+    )
+    for premises in itertools.chain(*[itertools.combinations(facts, n) for n in range(3)]):
+        covering = [case for case in case_model.cases if subset(premises, case.facts)]
+        max_probability = max([case.probability for case in covering], default=None)
+        assert case_model.most_preferred_cases(list(premises)) == [
+            case for case in covering if case.probability == max_probability
+        ]
+        for conclusion in facts:
+            argument = Argument(list(premises), [conclusion])
+            coherent = any(
+                [subset([*premises, conclusion], case.facts) for case in covering]
+            )
+            assert argument.is_coherent_in(case_model) == coherent
+            assert argument.is_conclusive_in(case_model) == (
+                coherent and all([conclusion in case.facts for case in covering])
+            )
+
+
+def test_facts_are_interned() -> None:
+    low = Fact("medv", "low", ["low", "high"])
+    assert low is Fact("medv", "low", ("high", "low"))
+    assert low is Fact.fromStr("low_medv", ["low", "high"])
+    assert pickle.loads(pickle.dumps(low)) is low
+    assert low.other_categories == (low, Fact("medv", "high", ["low", "high"]))
+    # summed hashes used to make these equal
+    assert Fact("a", "b") != Fact("b", "a")
+    # facts that are no longer used are dropped from the intern table
+    unused = Fact("unused", "x", ["x", "y"]).other_categories[1]
+    assert len([key for key in Fact._interned.keys() if key[0] == "unused"]) == 2
+    del unused
+    gc.collect()
+    assert not [key for key in Fact._interned.keys() if key[0] == "unused"]
+
+
+def test_premise_cache() -> None:
+    case_model = CaseModel.fromStr([(0.5, "a, b"), (0.3, "a, ¬b"), (0.2, "¬a, b")])
+    cache = PremiseCache(case_model.index, maxsize=2)
+    a, b, not_b = Fact("a"), Fact("b"), Fact("b", "false")
+    assert cache.max_probability([a]) == 0.5
+    assert cache.max_probability([a, not_b]) == 0.3
+    assert cache.max_probability([not_b, a]) == 0.3
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert case_model.index.members(cache.most_preferred([b])) == [case_model.cases[0]]
+    assert len(cache.entries) == 2 and frozenset([a]) not in cache.entries
+    assert cache.max_probability([Fact("c")]) == 0.0
+
+
+def test_case_model_validation() -> None:
+    def violation(cases) -> str:
+        try:
+            CaseModel.fromStr(cases).validate()
+        except AssertionError as e:
+            return str(e)
+        return ""
+
+    assert violation([(0.5, "a, b"), (0.3, "a, ¬b"), (0.2, "¬a")]) == ""
+    # a case may consist of a single fact, wherever it is in the case model
+    assert violation([(0.2, "¬a"), (0.5, "a, b"), (0.3, "a, ¬b")]) == ""
+    assert "condition 1 was violated by 0.5: a ∧ b and 0.2: a" in violation(
+        [(0.5, "a, b"), (0.3, "¬a, b"), (0.2, "a")]
+    )
+    assert "condition 2 was violated by 0.3: b and 0.2: a ∧ b" in violation(
+        [(0.5, "¬a, ¬b"), (0.3, "b"), (0.2, "a, b")]
+    )
+    assert "condition 3 was violated" in violation([(0.5, "a, b"), (0.5, "b, a")])
+    assert "condition 4 was violated" in violation([(0.5, "a"), (float("nan"), "¬a")])
+
+    # all combinations of 12 statements, and then one more case implied by the eighth
+    case_model = CaseModel(
+        [
+            Case(1, [Fact("s%d" % s, "true" if i >> s & 1 else "false") for s in range(12)])
+            for i in range(2**12)
+        ]
+    )
+    assert case_model.validate(n_jobs=2)
+    subcase = Case(0, case_model.cases[7].facts[:5])
+    case_model = CaseModel(case_model.cases + [subcase])
+    for n_jobs in [None, 2]:
+        try:
+            case_model.validate(n_jobs=n_jobs)
+            assert False
+        except AssertionError as e:
+            assert str(e) == "Case Model not valid, condition 2 was violated by %s and %s" % (
+                subcase,
+                case_model.cases[7],
+            )
+
+
+def test_schema_is_cached_until_cases_are_added() -> None:
+    case_model = CaseModel.fromStr([(0.5, "a, b"), (0.5, "¬a, c")])
+    schema = case_model.schema
+    assert case_model.schema is schema
+    assert dict(case_model.namesAndCategories) == {
+        "a": ("true", "false"),
+        "b": ("true", "false"),
+        "c": ("true", "false"),
+    }
+    assert schema.facts_about("b") == [Fact("b"), Fact("b", "false")]
+    assert [schema.facts[i] for i in schema.fact_ids["c"]] == schema.facts_about("c")
+    covering = case_model.index.covering([Fact("a")])
+
+    case_model.add_cases([Case.fromStr(0.25, "¬a, ¬c, d")])
+    assert case_model.schema is not schema
+    assert list(case_model.namesAndCategories) == ["a", "b", "c", "d"]
+    assert case_model.index.covering([Fact("d")]) != 0
+    assert len(case_model.index.cases) == 3 and covering != case_model.index.all_cases